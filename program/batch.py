@@ -0,0 +1,140 @@
+import io
+import os
+import runpy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stderr, redirect_stdout
+
+from utils.file_operations import collect_images
+from utils.help import print_help
+from utils.log import configure_logging
+from utils.parse_arguments import parse_arguments
+from utils.profiling import finish_profiling
+
+# ==============================
+# BATCH SCRIPT
+# ==============================
+# Runs one of the task scripts over a whole directory (or glob) of images in a
+# pool of worker processes. Each worker imports Python, NumPy and PIL once and
+# then executes the task script in-process for every image it is given.
+#
+# Usage: python3 batch.py <task> <input_dir_or_glob> <output_dir> [--command=value ...]
+#
+# Outputs of <input_dir>/<name>.<ext> go to <output_dir>/<name>_<ext>/ (with the
+# subdirectories between the input root and the image, when a glob spans several):
+#   - files the task writes under fixed names (output_negative.bmp, histogram.png, ...)
+#   - <name>.<ext> for tasks that take an output path (task2-task4)
+#   - log.txt with everything the task printed or logged
+# An image counts as failed when its task raises, exits early or prints an "Error:" line.
+
+BATCH_OPTIONS = ('workers', 'pair_dir')
+
+
+def strip_batch_options(arguments):
+    """Remove the batch-only options so the rest can be forwarded to the task script."""
+    forwarded = []
+    i = 0
+    while i < len(arguments):
+        key = arguments[i].lstrip('-').split('=', 1)[0]
+        if arguments[i].startswith('--') and key in BATCH_OPTIONS:
+            if '=' not in arguments[i] and i + 1 < len(arguments) and not arguments[i + 1].startswith('--'):
+                i += 1  # Skip the separate value as well
+        else:
+            forwarded.append(arguments[i])
+        i += 1
+    return forwarded
+
+
+def output_subdir(input_path, root):
+    """
+    Output directory of an image relative to the batch output directory. The
+    extension is kept (lena.bmp -> lena_bmp) so lena.bmp and lena.png do not
+    share a directory, and so is the path below root for globs over several directories.
+    """
+    stem, ext = os.path.splitext(os.path.relpath(input_path, root))
+    return f"{stem}_{ext.lstrip('.')}" if ext else stem
+
+
+def run_task(script_path, input_path, second_path, work_dir, commands):
+    """Execute a task script for one image inside the current worker process."""
+    os.makedirs(work_dir, exist_ok=True)
+    os.chdir(work_dir)  # Tasks write several outputs under fixed names into the cwd
+    sys.argv = [script_path, input_path, second_path] + commands
+
+    log = io.StringIO()
+    status = 'ok'
+    start = time.perf_counter()
+    with redirect_stdout(log), redirect_stderr(log):
+        # Log messages follow sys.stdout into the log, also those before the task configures logging
+        configure_logging({})
+        try:
+            runpy.run_path(script_path, run_name='__main__')
+        except SystemExit as e:
+            # Tasks stop with a bare sys.exit() after reporting an error; a finished task falls off the end
+            status = 'exited early' if e.code in (None, 0) else f'exit code {e.code}'
+        except Exception as e:
+            status = f'{type(e).__name__}: {e}'
+        elapsed = time.perf_counter() - start
+        finish_profiling()  # --profile: workers never run atexit handlers, so report into this image's log
+
+    output = log.getvalue()
+    errors = [line.strip() for line in output.splitlines() if 'Error:' in line]
+    if errors and status in ('ok', 'exited early'):
+        status = errors[0]
+    with open(os.path.join(work_dir, 'log.txt'), 'w') as f:
+        f.write(output)
+    return input_path, status, elapsed
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4 or '--help' in sys.argv:
+        print_help()
+        sys.exit()
+
+    task = sys.argv[1].replace('.py', '')
+    if not task.startswith('task'):
+        task = f'task{task}'
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f'{task}.py')
+    if not os.path.isfile(script_path):
+        print(f"Error: Unknown task '{sys.argv[1]}'.")
+        sys.exit(1)
+
+    images = collect_images(sys.argv[2])
+    if not images:
+        print(f"Error: No images found for '{sys.argv[2]}'.")
+        sys.exit(1)
+    output_dir = os.path.abspath(sys.argv[3])
+    input_root = os.path.commonpath([os.path.dirname(path) for path in images])
+
+    args_dict = parse_arguments(sys.argv[4:])
+    commands = strip_batch_options(sys.argv[4:])
+    workers = int(args_dict.get('workers', os.cpu_count() or 1))
+    pair_dir = args_dict.get('pair_dir')
+
+    print(f"Running {task} on {len(images)} images with {workers} workers...")
+    start = time.perf_counter()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for input_path in images:
+            name = os.path.basename(input_path)
+            work_dir = os.path.join(output_dir, output_subdir(input_path, input_root))
+            if pair_dir:
+                # Second image comes from a parallel directory (e.g. noisy versions for task1)
+                second_path = os.path.abspath(os.path.join(pair_dir, name))
+            elif task == 'task1':
+                second_path = input_path  # task1 reads its second argument as an image
+            else:
+                second_path = os.path.join(work_dir, name)
+            futures.append(executor.submit(run_task, script_path, input_path, second_path, work_dir, commands))
+
+        for future in as_completed(futures):
+            input_path, status, elapsed = future.result()
+            if status != 'ok':
+                failures += 1
+            print(f"[{status}] {os.path.basename(input_path)} ({elapsed:.2f}s)")
+
+    total = time.perf_counter() - start
+    print(f"Processed {len(images) - failures}/{len(images)} images in {total:.2f}s "
+          f"({len(images) / total:.2f} images/s). Outputs are in '{output_dir}'.")
@@ -0,0 +1,441 @@
+import importlib
+import inspect
+import io
+import json
+import os
+import pkgutil
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+import functions
+from functions import (characteristics, denoise_tuning, elementary, fourier, geometric, histogram, improvement,
+                       linear_filtration, low_high_pass_filter, morphological, noise_removal,
+                       non_linear_filtration, pipeline, pyramid, resampling, segmentation, similarity_measures)
+from utils.image_data import ImageData
+from utils.parse_arguments import parse_arguments
+
+# ==============================
+# BENCHMARK SCRIPT
+# ==============================
+# Times every public function in functions/ on the bundled test images,
+# for grayscale and RGB, at three sizes:
+#   small    - the *_small.bmp images (128x128)
+#   full     - lena.bmp / lenac.bmp (512x512)
+#   upscaled - the full-size images enlarged 2x (1024x1024)
+#
+# Usage: python3 benchmark.py [output.json] [--sizes=small,full,upscaled] [--modes=L,RGB]
+#                             [--only=name] [--repeat=3] [--max_pixels=N] [--no_memory]
+#                             [--baseline=previous.json]
+#
+# Reports the best wall time, throughput in megapixels per second and the peak
+# memory traced by tracemalloc, and saves everything to JSON. With --baseline,
+# each result is compared to a previous run and regressions are flagged.
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+SOURCES = {
+    ('L', 'small'): ('grayscale/boat_small.bmp', 1),
+    ('L', 'full'): ('grayscale/lena.bmp', 1),
+    ('L', 'upscaled'): ('grayscale/lena.bmp', 2),
+    ('RGB', 'small'): ('grayscale/boat_small.bmp', 1),
+    ('RGB', 'full'): ('lenac.bmp', 1),
+    ('RGB', 'upscaled'): ('lenac.bmp', 2),
+}
+NOISY_SOURCES = {'L': 'greyscale_noise/lena_impulse3.bmp', 'RGB': 'color_noise/lenac_impulse3.bmp'}
+REGRESSION_RATIO = 1.2  # Slower than baseline by more than this is reported
+
+CROSS = np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]])
+SQUARE = np.ones((3, 3), dtype=int)
+
+
+class BenchmarkInput:
+    """One test image plus derived inputs (noisy copy, histogram, spectrum...) built on demand."""
+
+    def __init__(self, mode, size_name, tmp_dir):
+        path, scale = SOURCES[(mode, size_name)]
+        im = Image.open(os.path.join(IMAGES_DIR, path)).convert(mode)
+        noisy = Image.open(os.path.join(IMAGES_DIR, NOISY_SOURCES[mode])).convert(mode)
+        noisy = noisy.resize(im.size, Image.NEAREST)
+        if scale != 1:
+            im = im.resize((im.width * scale, im.height * scale), Image.NEAREST)
+            noisy = noisy.resize(im.size, Image.NEAREST)
+
+        self.mode = mode
+        self.size_name = size_name
+        self.tmp_dir = tmp_dir
+        self.im = im
+        self.pixels = ImageData.from_pil(im)
+        self.noisy = ImageData.from_pil(noisy)
+        self.size = im.size
+        self.width, self.height = im.size
+        self._derived = {}
+
+    def derived(self, name, build):
+        if name not in self._derived:
+            with redirect_stdout(io.StringIO()):
+                self._derived[name] = build()
+        return self._derived[name]
+
+    @property
+    def channel(self):
+        """First channel (or the grayscale plane) as a float array."""
+        array = self.pixels.array if self.mode == 'L' else self.pixels.array[:, :, 0]
+        return array.astype(float)
+
+    @property
+    def histogram(self):
+        return self.derived('histogram', lambda: histogram.calculate_histogram(self.pixels, self.mode))
+
+    @property
+    def channel_histogram(self):
+        return self.histogram[0] if self.mode == 'RGB' else self.histogram
+
+    @property
+    def frequency_data(self):
+        return self.derived('frequency_data', lambda: fourier.compute_frequency_data(self.pixels, self.size, self.mode))
+
+    @property
+    def binary(self):
+        gray = self.pixels.array if self.mode == 'L' else self.pixels.array[:, :, 0]
+        return self.derived('binary', lambda: (gray > 127).astype(np.uint8))
+
+    @property
+    def window_histogram(self):
+        """Cumulative counts and value sums of the first row of 9x9 window histograms of the noisy image."""
+        def build():
+            plane = self.noisy.array if self.mode == 'L' else self.noisy.array[:, :, 0]
+            histograms = next(noise_removal.window_histograms(plane, 4))
+            return np.cumsum(histograms, axis=1), np.cumsum(histograms * np.arange(256), axis=1)
+        return self.derived('window_histogram', build)
+
+    @property
+    def bmp_files(self):
+        """Paths of the image and its noisy copy saved as uncompressed BMPs (for the memory-mapped readers)."""
+        def build():
+            paths = (self.output(f'{self.mode}_{self.size_name}.bmp'), self.output(f'{self.mode}_{self.size_name}_noisy.bmp'))
+            self.im.save(paths[0])
+            self.noisy.to_pil().save(paths[1])
+            return paths
+        return self.derived('bmp_files', build)
+
+    def output(self, name):
+        return os.path.join(self.tmp_dir, name)
+
+
+def histogram_stats(data):
+    return data.channel_histogram, characteristics.calculate_mean(data.channel_histogram)
+
+
+# (module, function name, call(data), modes, max_pixels or None)
+CASES = [
+    # characteristics (work on the histogram, so their cost does not depend on image size)
+    (characteristics, 'calculate_mean', lambda d: characteristics.calculate_mean(d.channel_histogram), ('L', 'RGB'), None),
+    (characteristics, 'calculate_mean_rgb', lambda d: characteristics.calculate_mean_rgb(d.histogram), ('RGB',), None),
+    (characteristics, 'calculate_variance', lambda d: characteristics.calculate_variance(*histogram_stats(d)), ('L', 'RGB'), None),
+    (characteristics, 'calculate_variance_rgb', lambda d: characteristics.calculate_variance_rgb(
+        d.histogram, characteristics.calculate_mean_rgb(d.histogram)), ('RGB',), None),
+    (characteristics, 'calculate_standard_dev', lambda d: characteristics.calculate_standard_dev(
+        characteristics.calculate_variance(*histogram_stats(d))), ('L', 'RGB'), None),
+    (characteristics, 'calculate_variation_coefficient_1', lambda d: characteristics.calculate_variation_coefficient_1(
+        characteristics.calculate_mean(d.channel_histogram), 1.0), ('L', 'RGB'), None),
+    (characteristics, 'calculate_asymmetry_coefficient', lambda d: characteristics.calculate_asymmetry_coefficient(
+        d.channel_histogram), ('L', 'RGB'), None),
+    (characteristics, 'calculate_asymmetry_coefficient_rgb', lambda d: characteristics.calculate_asymmetry_coefficient_rgb(
+        d.histogram), ('RGB',), None),
+    (characteristics, 'calculate_flattening_coefficient', lambda d: characteristics.calculate_flattening_coefficient(
+        d.channel_histogram), ('L', 'RGB'), None),
+    (characteristics, 'calculate_flattening_coefficient_rgb', lambda d: characteristics.calculate_flattening_coefficient_rgb(
+        d.histogram), ('RGB',), None),
+    (characteristics, 'calculate_variation_coefficient_2', lambda d: characteristics.calculate_variation_coefficient_2(
+        d.channel_histogram), ('L', 'RGB'), None),
+    (characteristics, 'calculate_variation_coefficient_2_rgb', lambda d: characteristics.calculate_variation_coefficient_2_rgb(
+        d.histogram), ('RGB',), None),
+    (characteristics, 'calculate_entropy', lambda d: characteristics.calculate_entropy(d.channel_histogram), ('L', 'RGB'), None),
+    (characteristics, 'calculate_entropy_rgb', lambda d: characteristics.calculate_entropy_rgb(d.histogram), ('RGB',), None),
+
+    # elementary
+    (elementary, 'adjust_brightness', lambda d: elementary.adjust_brightness(d.pixels, 40), ('L', 'RGB'), None),
+    (elementary, 'adjust_contrast', lambda d: elementary.adjust_contrast(d.pixels, 1.3), ('L', 'RGB'), None),
+    (elementary, 'apply_negative', lambda d: elementary.apply_negative(d.pixels), ('L', 'RGB'), None),
+    (elementary, 'brightness_lut', lambda d: elementary.brightness_lut(40), ('L',), None),
+    (elementary, 'contrast_lut', lambda d: elementary.contrast_lut(1.3), ('L',), None),
+    (elementary, 'negative_lut', lambda d: elementary.negative_lut(), ('L',), None),
+    (elementary, 'compose_luts', lambda d: elementary.compose_luts(
+        elementary.brightness_lut(40), elementary.contrast_lut(1.3), elementary.negative_lut()), ('L',), None),
+    (elementary, 'apply_lut', lambda d: elementary.apply_lut(d.pixels, elementary.negative_lut()), ('L', 'RGB'), None),
+    (elementary, 'apply_point_operations', lambda d: elementary.apply_point_operations(
+        d.pixels, [elementary.brightness_lut(40), elementary.contrast_lut(1.3), elementary.negative_lut()]), ('L', 'RGB'), None),
+
+    # fourier (slow_dft/slow_idft are O(N^2) per row, so only the small images)
+    (fourier, 'slow_dft', lambda d: np.apply_along_axis(fourier.slow_dft, 1, d.channel), ('L', 'RGB'), 128 * 128),
+    (fourier, 'slow_idft', lambda d: np.apply_along_axis(fourier.slow_idft, 1, d.frequency_data[0]), ('L', 'RGB'), 128 * 128),
+    (fourier, 'fast_fft', lambda d: np.apply_along_axis(fourier.fast_fft, 1, d.channel), ('L', 'RGB'), None),
+    (fourier, 'fast_ifft', lambda d: np.apply_along_axis(fourier.fast_ifft, 1, d.frequency_data[0]), ('L', 'RGB'), None),
+    (fourier, 'compute_frequency_data', lambda d: fourier.compute_frequency_data(d.pixels, d.size, d.mode), ('L', 'RGB'), None),
+    (fourier, 'save_magnitude_spectrum', lambda d: fourier.save_magnitude_spectrum(
+        d.frequency_data, d.size, d.mode, d.output('spectrum')), ('L', 'RGB'), None),
+    (fourier, 'process_and_save_fourier', lambda d: fourier.process_and_save_fourier(
+        d.pixels, d.size, d.mode, d.output('fourier'), frequency_data=d.frequency_data), ('L', 'RGB'), None),
+
+    # geometric (flips and rotations return views; the copy happens when they are saved)
+    (geometric, 'horizontal_flip', lambda d: geometric.horizontal_flip(d.pixels, d.width, d.height), ('L', 'RGB'), None),
+    (geometric, 'vertical_flip', lambda d: geometric.vertical_flip(d.pixels, d.width, d.height), ('L', 'RGB'), None),
+    (geometric, 'diagonal_flip', lambda d: geometric.diagonal_flip(d.pixels, d.width, d.height), ('L', 'RGB'), None),
+    (geometric, 'transpose', lambda d: geometric.transpose(d.pixels, d.width, d.height), ('L', 'RGB'), None),
+    (geometric, 'anti_transpose', lambda d: geometric.anti_transpose(d.pixels, d.width, d.height), ('L', 'RGB'), None),
+    (geometric, 'rotate_90', lambda d: geometric.rotate_90(d.pixels, d.width, d.height), ('L', 'RGB'), None),
+    (geometric, 'rotate_180', lambda d: geometric.rotate_180(d.pixels, d.width, d.height), ('L', 'RGB'), None),
+    (geometric, 'rotate_270', lambda d: geometric.rotate_270(d.pixels, d.width, d.height), ('L', 'RGB'), None),
+    (geometric, 'rotation_matrix', lambda d: geometric.rotation_matrix(2.5, d.width, d.height, True), ('L',), None),
+    (geometric, 'warp_map', lambda d: (geometric._cached_warp_map.cache_clear(), geometric.warp_map(
+        d.size, d.size, geometric.rotation_matrix(2.5, d.width, d.height)[0])), ('L',), None),  # Uncached build
+    (geometric, 'padded_for_warp', lambda d: geometric.padded_for_warp(d.pixels.array), ('L', 'RGB'), None),
+    (geometric, 'apply_warp_map', lambda d: geometric.apply_warp_map(d.pixels.array, geometric.warp_map(
+        d.size, d.size, geometric.rotation_matrix(2.5, d.width, d.height)[0])), ('L', 'RGB'), None),
+    (geometric, 'affine_warp', lambda d: geometric.affine_warp(
+        d.pixels, d.width, d.height, [[1, 0.2, 0], [0.1, 1, 0]], method='nearest'), ('L', 'RGB'), None),
+    (geometric, 'rotate_image', lambda d: geometric.rotate_image(d.pixels, d.width, d.height, 2.5), ('L', 'RGB'), None),
+    (geometric, 'shrink_image', lambda d: geometric.shrink_image(d.pixels, d.width, d.height, 2), ('L', 'RGB'), None),
+    (geometric, 'enlarge_image', lambda d: geometric.enlarge_image(d.pixels, d.width, d.height, 2), ('L', 'RGB'), None),
+
+    # histogram
+    (histogram, 'calculate_histogram', lambda d: histogram.calculate_histogram(d.pixels, d.mode), ('L', 'RGB'), None),
+    (histogram, 'save_histogram_image', lambda d: histogram.save_histogram_image(
+        d.pixels, d.mode, d.output('histogram.png')), ('L', 'RGB'), None),
+    (histogram, 'roi_mask', lambda d: histogram.roi_mask(d.size, (0, 0, d.width // 2, d.height // 2)), ('L',), None),
+    (histogram, 'joint_histogram', lambda d: histogram.joint_histogram(d.pixels, d.mode, (0, 1, 2)), ('RGB',), None),
+    (histogram, 'save_joint_histogram_image', lambda d: histogram.save_joint_histogram_image(
+        d.pixels, d.mode, d.output('joint_histogram.png')), ('RGB',), None),
+    (histogram, 'IncrementalHistogram', lambda d: histogram.IncrementalHistogram(d.pixels, d.mode, d.size).update(
+        0, 0, d.noisy.array[:d.height // 4, :d.width // 4]), ('L', 'RGB'), None),
+
+    # improvement (applied to every pixel, as task2 --hpower does)
+    (improvement, 'power_2_3_pdf', lambda d: [improvement.power_2_3_pdf(d.channel_histogram, 0, 255, value, len(d.pixels))
+                                              for value in d.channel.astype(int).reshape(-1).tolist()],
+     ('L', 'RGB'), 128 * 128),
+
+    # linear filtration
+    (linear_filtration, 'universal_convolution', lambda d: linear_filtration.universal_convolution(
+        d.pixels, d.size, {'filter': 'N'}), ('L', 'RGB'), None),
+    (linear_filtration, 'optimized_convolution', lambda d: linear_filtration.optimized_convolution(d.pixels, d.size),
+     ('L', 'RGB'), None),
+
+    # frequency-domain filters
+    (low_high_pass_filter, 'apply_low_pass_filter', lambda d: low_high_pass_filter.apply_low_pass_filter(
+        d.frequency_data, 30), ('L', 'RGB'), None),
+    (low_high_pass_filter, 'apply_high_pass_filter', lambda d: low_high_pass_filter.apply_high_pass_filter(
+        d.frequency_data, 30), ('L', 'RGB'), None),
+    (low_high_pass_filter, 'apply_band_pass_filter', lambda d: low_high_pass_filter.apply_band_pass_filter(
+        d.frequency_data, 10, 50), ('L', 'RGB'), None),
+    (low_high_pass_filter, 'apply_band_cut_filter', lambda d: low_high_pass_filter.apply_band_cut_filter(
+        d.frequency_data, 10, 50), ('L', 'RGB'), None),
+    (low_high_pass_filter, 'apply_directional_high_pass_filter', lambda d: low_high_pass_filter.apply_directional_high_pass_filter(
+        d.frequency_data, 30, [(350, 10), (80, 100)]), ('L', 'RGB'), None),
+    (low_high_pass_filter, 'apply_phase_modifying_filter', lambda d: low_high_pass_filter.apply_phase_modifying_filter(
+        d.frequency_data, 2, 3), ('L', 'RGB'), None),
+    (low_high_pass_filter, 'process_and_save_filtered', lambda d: low_high_pass_filter.process_and_save_filtered(
+        d.frequency_data, d.size, d.mode, d.output('filtered'), 'lowpass'), ('L', 'RGB'), None),
+
+    # morphology (binary image thresholded from the grayscale one)
+    (morphological, 'dilation', lambda d: morphological.dilation(d.binary, CROSS), ('L',), None),
+    (morphological, 'erosion', lambda d: morphological.erosion(d.binary, CROSS), ('L',), None),
+    (morphological, 'opening', lambda d: morphological.opening(d.binary, SQUARE), ('L',), None),
+    (morphological, 'closing', lambda d: morphological.closing(d.binary, SQUARE), ('L',), None),
+    (morphological, 'hitOrMiss', lambda d: morphological.hitOrMiss(d.binary, CROSS, 1 - CROSS), ('L',), None),
+    (morphological, 'iterative_dilation', lambda d: morphological.iterative_dilation(d.binary, (0, 0), SQUARE),
+     ('L',), 128 * 128),
+
+    # noise removal
+    (noise_removal, 'alpha_trimmed_mean_filter', lambda d: noise_removal.alpha_trimmed_mean_filter(
+        d.noisy, d.width, d.height, 3, 2), ('L', 'RGB'), None),
+    (noise_removal, 'geometric_mean_filter', lambda d: noise_removal.geometric_mean_filter(
+        d.noisy, d.width, d.height, 3), ('L', 'RGB'), None),
+    (noise_removal, 'median_filter', lambda d: noise_removal.median_filter(
+        d.noisy, d.width, d.height, 5), ('L', 'RGB'), None),
+    (noise_removal, 'adaptive_median_filter', lambda d: noise_removal.adaptive_median_filter(
+        d.noisy, d.width, d.height, 7), ('L', 'RGB'), None),
+    (noise_removal, 'vector_median_filter', lambda d: noise_removal.vector_median_filter(
+        d.noisy, d.width, d.height, 3), ('L', 'RGB'), None),
+    (noise_removal, 'window_histograms', lambda d: sum(1 for _ in noise_removal.window_histograms(
+        d.noisy.array if d.mode == 'L' else d.noisy.array[:, :, 0], 4)), ('L',), None),
+    (noise_removal, 'rank_values', lambda d: noise_removal.rank_values(d.window_histogram[0], 41), ('L',), None),
+    (noise_removal, 'rank_sums', lambda d: noise_removal.rank_sums(*d.window_histogram, 41), ('L',), None),
+
+    # denoiser tuning (median only: every candidate runs a full filter and comparison)
+    (denoise_tuning, 'parameter_chains', lambda d: [denoise_tuning.parameter_chains(name)
+                                                    for name in denoise_tuning.DENOISERS], ('L',), None),
+    (denoise_tuning, 'tune_denoiser', lambda d: denoise_tuning.tune_denoiser(
+        d.pixels, d.noisy, d.width, d.height, ['median']), ('L',), 256 * 256),
+
+    # non-linear filtration
+    (non_linear_filtration, 'apply_roberts_operator', lambda d: non_linear_filtration.apply_roberts_operator(
+        d.pixels, d.size), ('L', 'RGB'), None),
+
+    # lazy pipeline (task1 chain)
+    (pipeline, 'ImagePipeline', lambda d: pipeline.ImagePipeline(d.pixels, d.mode, d.size).brightness(40).contrast(1.3)
+     .negative().hflip().vflip().shrink(2).enlarge(2).materialize(), ('L', 'RGB'), None),
+
+    # pyramid (built from scratch each time, then four thumbnails)
+    (pyramid, 'reduce_box', lambda d: pyramid.reduce_box(d.pixels.array), ('L', 'RGB'), None),
+    (pyramid, 'reduce_gaussian', lambda d: pyramid.reduce_gaussian(d.pixels.array), ('L', 'RGB'), None),
+    (pyramid, 'ImagePyramid', lambda d: [pyramid.ImagePyramid(d.pixels, d.mode, d.size).for_scale(scale)
+                                         for scale in (0.5, 0.25, 0.1, 0.05)], ('L', 'RGB'), None),
+    (pyramid, 'get_pyramid', lambda d: pyramid.get_pyramid(d.pixels, d.mode, d.size).for_scale(0.1), ('L', 'RGB'), None),
+
+    # resampling (downscale to 3/8, then a 1.5x upscale)
+    (resampling, 'box_kernel', lambda d: resampling.box_kernel(np.linspace(-4, 4, d.width * d.height)), ('L',), None),
+    (resampling, 'bilinear_kernel', lambda d: resampling.bilinear_kernel(np.linspace(-4, 4, d.width * d.height)), ('L',), None),
+    (resampling, 'bicubic_kernel', lambda d: resampling.bicubic_kernel(np.linspace(-4, 4, d.width * d.height)), ('L',), None),
+    (resampling, 'lanczos_kernel', lambda d: resampling.lanczos_kernel(np.linspace(-4, 4, d.width * d.height)), ('L',), None),
+    (resampling, 'resample_axis', lambda d: resampling.resample_axis(
+        d.pixels.array.astype(np.float32), d.height * 3 // 8, 0, 'lanczos'), ('L', 'RGB'), None),
+    (resampling, 'resample', lambda d: resampling.resample(
+        d.pixels, d.size, (d.width * 3 // 8, d.height * 3 // 8), 'lanczos'), ('L', 'RGB'), None),
+    (resampling, 'scale_image', lambda d: resampling.scale_image(d.pixels, d.width, d.height, 1.5, 'bicubic'),
+     ('L', 'RGB'), None),
+
+    # segmentation
+    (segmentation, 'region_growing', lambda d: segmentation.region_growing(
+        d.pixels, d.size, [(d.width // 2, d.height // 2)], threshold=20), ('L',), None),
+
+    # similarity measures
+    (similarity_measures, 'compare_images', lambda d: similarity_measures.compare_images(
+        d.pixels, d.noisy, d.width, d.height), ('L', 'RGB'), None),
+    (similarity_measures, 'compare_many', lambda d: similarity_measures.compare_many(
+        d.pixels, [d.noisy] * 16, d.width, d.height), ('L', 'RGB'), None),
+    (similarity_measures, 'compare_image_files', lambda d: similarity_measures.compare_image_files(
+        *d.bmp_files), ('L', 'RGB'), None),
+    (similarity_measures, 'mean_square_error', lambda d: similarity_measures.mean_square_error(
+        d.pixels, d.noisy, d.width, d.height), ('L', 'RGB'), None),
+    (similarity_measures, 'peak_mean_square_error', lambda d: similarity_measures.peak_mean_square_error(
+        d.pixels, d.noisy, d.width, d.height), ('L', 'RGB'), None),
+    (similarity_measures, 'signal_to_noise_ratio', lambda d: similarity_measures.signal_to_noise_ratio(
+        d.pixels, d.noisy, d.width, d.height), ('L', 'RGB'), None),
+    (similarity_measures, 'peak_signal_to_noise_ratio', lambda d: similarity_measures.peak_signal_to_noise_ratio(
+        d.pixels, d.noisy, d.width, d.height), ('L', 'RGB'), None),
+    (similarity_measures, 'structural_similarity', lambda d: similarity_measures.structural_similarity(
+        d.pixels, d.noisy, d.width, d.height), ('L', 'RGB'), None),
+    (similarity_measures, 'multiscale_structural_similarity', lambda d: similarity_measures.multiscale_structural_similarity(
+        d.pixels, d.noisy, d.width, d.height, window='box', window_size=7), ('L', 'RGB'), None),
+    (similarity_measures, 'maximum_difference', lambda d: similarity_measures.maximum_difference(d.pixels, d.noisy),
+     ('L', 'RGB'), None),
+]
+
+
+# Classes that only hold what a timed function returns (e.g. compare_images); nothing to time on their own
+RESULT_CLASSES = {'similarity_measures.ImageMetrics'}
+
+
+def public_functions():
+    """All public functions and classes defined in the functions package, as 'module.name'."""
+    names = set()
+    for module_info in pkgutil.iter_modules(functions.__path__):
+        module = importlib.import_module(f'functions.{module_info.name}')
+        for name, member in inspect.getmembers(module, lambda m: inspect.isfunction(m) or inspect.isclass(m)):
+            if member.__module__ == module.__name__ and not name.startswith('_'):
+                names.add(f'{module_info.name}.{name}')
+    return names - RESULT_CLASSES
+
+
+def measure(call, data, repeat, trace_memory):
+    """Best-of-repeat wall time and peak traced memory of call(data)."""
+    times = []
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call(data)
+            times.append(time.perf_counter() - start)
+            if times[-1] > 2.0:
+                break  # Slow case, one more run would not change the picture
+
+        peak = None
+        if trace_memory:
+            tracemalloc.start()
+            call(data)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return min(times), peak
+
+
+def compare_with_baseline(results, baseline_path):
+    """Print the speed ratio of every result against a previous JSON run."""
+    with open(baseline_path) as f:
+        baseline = {(r['function'], r['mode'], r['size']): r for r in json.load(f)['results']}
+
+    regressions = 0
+    print(f"\nComparison with {baseline_path}:")
+    for result in results:
+        previous = baseline.get((result['function'], result['mode'], result['size']))
+        if previous is None:
+            continue
+        ratio = result['seconds'] / previous['seconds'] if previous['seconds'] else float('inf')
+        flag = 'REGRESSION' if ratio > REGRESSION_RATIO else ''
+        regressions += bool(flag)
+        print(f"{result['function']:<55} {result['mode']:<4} {result['size']:<9} "
+              f"{previous['seconds']:>10.4f}s -> {result['seconds']:>10.4f}s  x{ratio:6.2f} {flag}")
+    print(f"{regressions} regression(s) above x{REGRESSION_RATIO}")
+    return regressions
+
+
+if __name__ == '__main__':
+    positional = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    args_dict = parse_arguments([arg for arg in sys.argv[1:] if arg.startswith('--')])
+    output_path = positional[0] if positional else 'benchmark_results.json'
+    sizes = args_dict.get('sizes', 'small,full,upscaled').split(',')
+    modes = args_dict.get('modes', 'L,RGB').split(',')
+    only = args_dict.get('only')
+    repeat = int(args_dict.get('repeat', 3))
+    max_pixels = int(args_dict['max_pixels']) if 'max_pixels' in args_dict else None
+    trace_memory = 'no_memory' not in args_dict
+
+    covered = {f'{module.__name__.split(".")[-1]}.{name}' for module, name, _, _, _ in CASES}
+    missing = sorted(public_functions() - covered)
+    if missing:
+        print(f"Warning: no benchmark case for {', '.join(missing)}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'function':<55} {'mode':<4} {'size':<9} {'pixels':>8} {'seconds':>10} {'MP/s':>9} {'peak MB':>9}")
+        for mode in modes:
+            for size_name in sizes:
+                data = BenchmarkInput(mode, size_name, tmp_dir)
+                pixel_count = data.width * data.height
+                for module, name, call, case_modes, case_max_pixels in CASES:
+                    function = f'{module.__name__.split(".")[-1]}.{name}'
+                    if mode not in case_modes or (only and only not in function):
+                        continue
+                    if (case_max_pixels and pixel_count > case_max_pixels) or (max_pixels and pixel_count > max_pixels):
+                        continue
+                    seconds, peak = measure(call, data, repeat, trace_memory)
+                    throughput = pixel_count / seconds / 1e6 if seconds else float('inf')
+                    results.append({
+                        'function': function, 'mode': mode, 'size': size_name,
+                        'width': data.width, 'height': data.height,
+                        'seconds': seconds, 'megapixels_per_second': throughput, 'peak_bytes': peak,
+                    })
+                    peak_text = f"{peak / 2**20:9.2f}" if peak is not None else f"{'-':>9}"
+                    print(f"{function:<55} {mode:<4} {size_name:<9} {pixel_count:>8} {seconds:>10.4f} "
+                          f"{throughput:>9.2f} {peak_text}")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'results': results,
+    }
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results saved to {output_path}")
+
+    if 'baseline' in args_dict:
+        regressions = compare_with_baseline(results, args_dict['baseline'])
+        sys.exit(1 if regressions else 0)
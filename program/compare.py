@@ -0,0 +1,107 @@
+import csv
+import json
+import os
+import sys
+
+from functions.similarity_measures import compare_many, METRIC_NAMES
+from utils.file_operations import collect_images, load_image
+from utils.help import print_help
+from utils.parse_arguments import parse_arguments
+
+# ==============================
+# COMPARE SCRIPT
+# ==============================
+# Compares one reference image with many candidates (e.g. the outputs of a
+# denoiser parameter sweep) and prints the table of similarity measures.
+# All candidates are compared in one pass over the reference (compare_many).
+#
+# Usage: python3 compare.py <reference> <candidate_file_dir_or_glob> ... [--command=value ...]
+#
+#   --metrics=mse,psnr      Columns to report (default: mse, pmse, snr, psnr, md)
+#   --per_channel           Add a column per channel for every metric (mse_0, mse_1, ...)
+#   --sort=metric           Order the rows from best to worst by this metric
+#   --output=table.csv      Also write the table as CSV (or JSON for a .json path)
+
+# Metrics where a smaller value means a closer match; for the others larger is better
+LOWER_IS_BETTER = ('mse', 'md')
+
+
+def collect_candidates(sources):
+    """Expand the candidate arguments: files are kept, directories and globs are listed."""
+    paths = []
+    for source in sources:
+        paths.extend([os.path.abspath(source)] if os.path.isfile(source) else collect_images(source))
+    return paths
+
+
+def metrics_table(paths, results, metric_names, per_channel=False):
+    """One row (dict) per candidate: its file name plus the requested measures."""
+    rows = []
+    for path, metrics in zip(paths, results):
+        row = {'candidate': os.path.basename(path)}
+        for name in metric_names:
+            row[name] = getattr(metrics, name)
+            if per_channel:
+                for channel, values in enumerate(metrics.channels):
+                    row[f'{name}_{channel}'] = values[name]
+        rows.append(row)
+    return rows
+
+
+def write_table(rows, output_path):
+    """Write the rows as JSON (for a .json path) or CSV."""
+    if output_path.lower().endswith('.json'):
+        with open(output_path, 'w') as f:
+            json.dump(rows, f, indent=2)
+    else:
+        with open(output_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    print(f"Table saved to {output_path}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or '--help' in sys.argv:
+        print_help()
+        sys.exit()
+
+    positional = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    args_dict = parse_arguments([arg for arg in sys.argv[1:] if arg.startswith('--')])
+
+    reference_path = positional[0]
+    candidate_paths = collect_candidates(positional[1:])
+    if not candidate_paths:
+        print("Error: No candidate images found.")
+        sys.exit(1)
+
+    metric_names = args_dict['metrics'].split(',') if isinstance(args_dict.get('metrics'), str) else list(METRIC_NAMES)
+    unknown = [name for name in metric_names if name not in METRIC_NAMES]
+    if unknown:
+        print(f"Error: Unknown metric '{unknown[0]}'. Use any of: {', '.join(METRIC_NAMES)}.")
+        sys.exit(1)
+
+    # Uncompressed BMPs are memory-mapped, so only one chunk of every image is read at a time
+    reference_pixels, _, size, _ = load_image(reference_path, use_memmap=True)
+    candidates = [load_image(path, use_memmap=True)[0] for path in candidate_paths]
+
+    print(f"Comparing {reference_path} with {len(candidates)} candidates...")
+    results = compare_many(reference_pixels, candidates, size[0], size[1])
+    rows = metrics_table(candidate_paths, results, metric_names, 'per_channel' in args_dict)
+
+    sort_by = args_dict.get('sort')
+    if isinstance(sort_by, str):
+        if sort_by not in metric_names:
+            print(f"Error: Can only sort by a reported metric ({', '.join(metric_names)}).")
+            sys.exit(1)
+        rows.sort(key=lambda row: row[sort_by], reverse=sort_by not in LOWER_IS_BETTER)
+
+    # Aligned table on stdout
+    columns = list(rows[0])
+    name_width = max(len('candidate'), *(len(row['candidate']) for row in rows))
+    print(f"{'candidate':<{name_width}} " + ' '.join(f'{column:>12}' for column in columns[1:]))
+    for row in rows:
+        print(f"{row['candidate']:<{name_width}} " + ' '.join(f'{row[column]:>12.4f}' for column in columns[1:]))
+
+    if isinstance(args_dict.get('output'), str):
+        write_table(rows, args_dict['output'])
@@ -0,0 +1,168 @@
+import sys
+
+from functions.geometric import shrink_image
+from functions.noise_removal import (alpha_trimmed_mean_filter, geometric_mean_filter, median_filter,
+                                     adaptive_median_filter, vector_median_filter)
+from functions.similarity_measures import compare_images, structural_similarity
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# name -> (filter, names of its parameters after pixels, width and height)
+DENOISERS = {
+    'alpha': (alpha_trimmed_mean_filter, ('kernel_size', 'alpha')),
+    'gmean': (geometric_mean_filter, ('kernel_size',)),
+    'median': (median_filter, ('kernel_size',)),
+    'amedian': (adaptive_median_filter, ('max_kernel_size',)),
+    'vmedian': (vector_median_filter, ('kernel_size',)),
+}
+KERNEL_SIZES = (3, 5, 7, 9)
+# Trimmed share of the largest possible alpha (window // 2) tried for every kernel size
+ALPHA_FRACTIONS = (0, 0.1, 0.2, 0.35, 0.5, 0.7, 1.0)
+TUNING_METRICS = ('mse', 'ssim')
+
+
+def parameter_chains(name):
+    """
+    The parameter space of a denoiser as chains of parameter tuples, ordered
+    so the score is expected to rise and then fall along each chain (more
+    smoothing removes more noise, until it blurs the image). Every chain is a
+    list of (params, subchain) pairs; subchain is None or a nested list that
+    refines params (e.g. the alpha values of one kernel size).
+    """
+    if name == 'alpha':
+        chain = []
+        for kernel_size in KERNEL_SIZES:
+            max_alpha = kernel_size * kernel_size // 2
+            alphas = sorted({round(max_alpha * fraction) for fraction in ALPHA_FRACTIONS})
+            chain.append(((kernel_size,), [((kernel_size, alpha), None) for alpha in alphas]))
+        return chain
+    if name == 'amedian':
+        return [((size,), None) for size in KERNEL_SIZES if size > 3] + [((11,), None)]
+    return [((size,), None) for size in KERNEL_SIZES]
+
+
+def _search_chain(chain, evaluate, patience):
+    """
+    Walk a chain until the score has not improved for patience steps in a row.
+
+    Returns the (score, params) pairs that were evaluated. Entries with a
+    subchain are scored by the best point of their subchain.
+    """
+    evaluated = []
+    best = float('inf')
+    misses = 0
+    for params, subchain in chain:
+        if subchain is None:
+            points = [(evaluate(params), params)]
+        else:
+            points = _search_chain(subchain, evaluate, patience)
+        evaluated.extend(points)
+
+        score = min(point_score for point_score, _ in points)
+        if score < best:
+            best, misses = score, 0
+        else:
+            misses += 1
+            if misses >= patience:
+                break  # Early stop: further along the chain only gets worse
+    return evaluated
+
+
+def tune_denoiser(reference_pixels, noisy_pixels, width, height, denoisers=None, metric='mse',
+                  proxy_factor=2, confirm=3, per_denoiser=3, patience=1, cache=None):
+    """
+    Search the parameters of the noise removal filters that best restore a noisy image.
+
+    Every candidate is first scored on a proxy: both images decimated by
+    proxy_factor (every proxy_factor-th pixel, so impulse noise stays as
+    sharp as in the original, which averaging would hide). Each parameter
+    chain stops as soon as its score stops improving.
+
+    Kernel sizes are not rescaled for the proxy (a 3x3 kernel there covers
+    proxy_factor times more of the scene), so close candidates can swap
+    places, e.g. alpha 3 and 4 of a 3x3 kernel. The proxy therefore only
+    shortlists: the per_denoiser best candidates of each of the confirm best
+    denoisers are filtered and scored again at full resolution, which decides.
+
+    Args:
+        reference_pixels: The clean image.
+        noisy_pixels: The noisy version of it.
+        width, height: Image size.
+        denoisers: Names from DENOISERS to try (default: all of them).
+        metric: 'mse' (lower is better) or 'ssim' (higher is better).
+        proxy_factor: Decimation of the proxy (1 scores everything at full resolution).
+        confirm: Number of denoisers (best proxy score first) checked at full resolution.
+        per_denoiser: Candidates of each of those denoisers checked at full resolution.
+        patience: Steps without improvement before a chain is abandoned.
+        cache: Optional ResultCache; filter results are then cached per (image, params).
+
+    Returns:
+        (confirmed, explored, best_pixels): confirmed and explored are lists of
+        dicts with 'denoiser', 'params' (dict) and 'proxy_score' ('score' too
+        for confirmed ones; for ssim the scores are the SSIM values). confirmed
+        is sorted best first; its first entry is the winner and best_pixels
+        the noisy image filtered with it.
+    """
+    denoisers = list(denoisers or DENOISERS)
+    unknown = [name for name in denoisers if name not in DENOISERS]
+    if unknown:
+        logger.error(f"Error: Unknown denoiser '{unknown[0]}'. Use any of: {', '.join(DENOISERS)}.")
+        sys.exit(1)
+    if int(proxy_factor) != proxy_factor or proxy_factor < 1:
+        logger.error("Error: The proxy factor must be a positive integer.")
+        sys.exit(1)
+    if metric not in TUNING_METRICS:
+        logger.error(f"Error: Unknown tuning metric '{metric}'. Use mse or ssim.")
+        sys.exit(1)
+
+    filters = {name: cache.wrap(DENOISERS[name][0]) if cache else DENOISERS[name][0] for name in denoisers}
+
+    def score(reference, filtered, size):
+        if metric == 'ssim':
+            return -structural_similarity(reference, filtered, size[0], size[1])  # Negated: lower is better
+        return compare_images(reference, filtered, size[0], size[1]).mse
+
+    if proxy_factor > 1:
+        proxy_factor = int(proxy_factor)
+        proxy_reference, proxy_width, proxy_height = shrink_image(reference_pixels, width, height, proxy_factor)
+        proxy_noisy, _, _ = shrink_image(noisy_pixels, width, height, proxy_factor)
+    else:
+        proxy_reference, proxy_noisy, proxy_width, proxy_height = reference_pixels, noisy_pixels, width, height
+
+    explored = []
+    for name in denoisers:
+        def evaluate(params):
+            filtered = filters[name](proxy_noisy, proxy_width, proxy_height, *params)
+            return score(proxy_reference, filtered, (proxy_width, proxy_height))
+
+        for proxy_score, params in _search_chain(parameter_chains(name), evaluate, patience):
+            explored.append({'denoiser': name, 'params': dict(zip(DENOISERS[name][1], params)),
+                             'proxy_score': proxy_score})
+        logger.info(f"Tuning {name}: {sum(entry['denoiser'] == name for entry in explored)} candidates on the proxy")
+
+    explored.sort(key=lambda entry: entry['proxy_score'])
+    finalist_denoisers = []
+    for entry in explored:
+        if entry['denoiser'] not in finalist_denoisers and len(finalist_denoisers) < confirm:
+            finalist_denoisers.append(entry['denoiser'])
+    finalists = [entry for name in finalist_denoisers
+                 for entry in [entry for entry in explored if entry['denoiser'] == name][:per_denoiser]]
+
+    confirmed = []
+    best_score, best_pixels = float('inf'), None
+    for entry in finalists:
+        params = tuple(entry['params'].values())
+        filtered = filters[entry['denoiser']](noisy_pixels, width, height, *params)
+        full_score = score(reference_pixels, filtered, (width, height))
+        confirmed.append(dict(entry, score=full_score))
+        if full_score < best_score:
+            best_score, best_pixels = full_score, filtered  # Kept, so the caller need not filter again
+    confirmed.sort(key=lambda entry: entry['score'])
+
+    if metric == 'ssim':
+        for entry in explored + confirmed:
+            entry['proxy_score'] = -entry['proxy_score']
+            if 'score' in entry:
+                entry['score'] = -entry['score']
+    return confirmed, explored, best_pixels
@@ -1,40 +1,86 @@
+import numpy as np
+
+from utils.image_data import ImageData
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Point operations are expressed as 256-entry lookup tables (LUTs).
+# A LUT has shape (256,) to map every channel the same way, or
+# (channels, 256) for per-channel mappings. Chains of point operations
+# are composed into a single LUT and applied with one gather.
+
+def brightness_lut(factor):
+    """LUT adding factor to each value (one factor per channel if a sequence is given)."""
+    values = np.arange(256)
+    factor = np.asarray(factor)[..., None]
+    return np.clip(values + factor, 0, 255).astype(np.uint8)
+
+def contrast_lut(factor):
+    """LUT multiplying the distance from 128 (midpoint) by factor."""
+    midpoint = 128
+    values = np.arange(256)
+    factor = np.asarray(factor, dtype=float)[..., None]
+    # astype(int) truncates towards zero like int() did in the per-pixel version
+    return np.clip(((values - midpoint) * factor + midpoint).astype(int), 0, 255).astype(np.uint8)
+
+def negative_lut():
+    """LUT inverting each value."""
+    return (255 - np.arange(256)).astype(np.uint8)
+
+def compose_luts(*luts):
+    """Compose LUTs into one, applied left to right (compose_luts(a, b) == b after a)."""
+    result = np.asarray(luts[0])
+    for lut in luts[1:]:
+        lut = np.asarray(lut)
+        if lut.ndim == 1:
+            result = lut[result]
+        else:
+            channels = lut.shape[0]
+            result = np.broadcast_to(result, (channels, 256))
+            result = lut[np.arange(channels)[:, None], result]
+    return result
+
+def apply_lut(pixels, lut):
+    """
+    Apply a LUT to every pixel with a single vectorized gather.
+
+    Accepts ImageData, NumPy arrays or the flat list of ints / tuples and
+    returns the same kind of object.
+    """
+    array = pixels.array if isinstance(pixels, ImageData) else np.asarray(pixels)
+    if array.dtype != np.uint8:
+        array = np.clip(array, 0, 255).astype(np.uint8)
+
+    lut = np.asarray(lut)
+    if lut.ndim == 1:
+        result = lut[array]
+    else:  # Per-channel LUT: lut[c, array[..., c]]
+        result = lut[np.arange(lut.shape[0]), array]
+
+    if isinstance(pixels, ImageData):
+        return ImageData(result, pixels.mode)
+    if isinstance(pixels, np.ndarray):
+        return result
+    if result.ndim == 1:  # Flat list of grayscale values
+        return result.tolist()
+    return [tuple(pixel) for pixel in result.tolist()]  # Flat list of RGB tuples
+
+def apply_point_operations(pixels, luts):
+    """Apply a chain of point operations (given as LUTs) in one pass over the pixels."""
+    return apply_lut(pixels, compose_luts(*luts))
+
 def adjust_brightness(pixels, factor):
     """Adjust brightness by adding factor to each pixel's RGB value."""
-    print(f"Adjusting brightness by a factor of {factor}")
-    new_pixels = []
-    for pixel in pixels:
-        if isinstance(pixel, int):  # Grayscale image
-            new_pixel = pixel + factor
-            new_pixels.append(max(0, min(255, new_pixel)))
-        else:  # RGB image
-            new_pixel = tuple(max(0, min(255, channel + factor)) for channel in pixel)
-            new_pixels.append(new_pixel)
-    return new_pixels
+    logger.info(f"Adjusting brightness by a factor of {factor}")
+    return apply_lut(pixels, brightness_lut(factor))
 
 def adjust_contrast(pixels, factor):
     """Adjust contrast by multiplying the distance from 128 (midpoint)."""
-    print(f"Adjusting contrast by a factor of {factor}")
-    midpoint = 128
-    new_pixels = []
-    for pixel in pixels:
-        print(pixel)
-        if isinstance(pixel, int):  # Grayscale image
-            new_pixel = int((pixel - midpoint) * factor + midpoint)
-            new_pixels.append(max(0, min(255, new_pixel)))
-        else:  # RGB image
-            new_pixel = tuple(int((channel - midpoint) * factor + midpoint) for channel in pixel)
-            new_pixels.append(tuple(max(0, min(255, channel)) for channel in new_pixel))
-    return new_pixels
+    logger.info(f"Adjusting contrast by a factor of {factor}")
+    return apply_lut(pixels, contrast_lut(factor))
 
 def apply_negative(pixels):
     """Apply a negative effect by inverting the color of each pixel."""
-    print(f"Applying negative filter")
-    new_pixels = []
-    for pixel in pixels:
-        if isinstance(pixel, int):  # Grayscale image
-            new_pixels.append(255 - pixel)
-        else:  # RGB image
-            new_pixels.append(tuple(255 - channel for channel in pixel))
-    return new_pixels
-
-
+    logger.info(f"Applying negative filter")
+    return apply_lut(pixels, negative_lut())
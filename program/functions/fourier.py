@@ -1,5 +1,8 @@
 import numpy as np
 from utils.file_operations import save_image
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 def slow_dft(signal):
     """Compute the Discrete Fourier Transform (DFT) using the direct definition."""
@@ -111,7 +114,7 @@ def save_magnitude_spectrum(frequency_data, size, mode, output_base_path):
         # Save the magnitude spectrum image for RGB
         magnitude_output_path = f"{output_base_path}_fourier_rgb.bmp"
         save_image(magnitude_image, 'RGB', size, magnitude_output_path)
-        print(f"Magnitude spectrum for RGB saved to '{magnitude_output_path}'.")
+        logger.info(f"Magnitude spectrum for RGB saved to '{magnitude_output_path}'.")
 
     else:
         # For grayscale, just use the first channel (since there's only one channel in grayscale images)
@@ -124,7 +127,7 @@ def save_magnitude_spectrum(frequency_data, size, mode, output_base_path):
         # Save the magnitude spectrum image for grayscale
         magnitude_output_path = f"{output_base_path}_fourier.bmp"
         save_image(magnitude_image, 'L', size, magnitude_output_path)
-        print(f"Magnitude spectrum saved to '{magnitude_output_path}'.")
+        logger.info(f"Magnitude spectrum saved to '{magnitude_output_path}'.")
 
 
 def process_and_save_fourier(input_pixels, size, mode, output_base_path, use_fast=True, frequency_data=None):
@@ -169,7 +172,7 @@ def process_and_save_fourier(input_pixels, size, mode, output_base_path, use_fas
 
     reconstructed_output_path = f"{output_base_path}_reconstructed.bmp"
     save_image(reconstructed_pixels, mode, size, reconstructed_output_path)
-    print(f"Reconstructed image saved to '{reconstructed_output_path}'.")
+    logger.info(f"Reconstructed image saved to '{reconstructed_output_path}'.")
     
 # Optimised slow FT(similar runtime to fast fourier)
 
@@ -1,71 +1,242 @@
+import functools
 import sys
 
+import numpy as np
+
+from utils.image_data import ImageData, as_array
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+def _as_image(pixels, width, height):
+    """Array of shape (height, width[, channels]) over the pixels and their mode (no copy for ImageData)."""
+    mode = pixels.mode if isinstance(pixels, ImageData) else None
+    return as_array(pixels, mode, (width, height)), mode
+
+def _view(array, mode):
+    """Wrap a view read-only, so writing to the result copies it instead of changing the source image."""
+    array = array.view()
+    array.flags.writeable = False
+    return ImageData(array, mode)
+
+# The flips, transposes and rotations below only change the strides of the
+# returned view, so they are O(1) whatever the image size. The pixels are
+# copied once, when the result is written out or modified.
+
 def horizontal_flip(pixels, width, height):
-    """Flip the image horizontally by reversing each row."""
-    print("Applying horizontal flip")
-    new_pixels = []
-    for y in range(height):
-        row = pixels[y * width: (y + 1) * width]
-        new_pixels.extend(row[::-1])  # Reverse the row
-    return new_pixels
+    """Flip the image horizontally (a view with reversed column strides)."""
+    logger.info("Applying horizontal flip")
+    image, mode = _as_image(pixels, width, height)
+    return _view(image[:, ::-1], mode)
 
 def vertical_flip(pixels, width, height):
-    """Flip the image vertically by reversing the rows."""
-    print("Applying vertical flip")
-    new_pixels = []
-    for y in range(height - 1, -1, -1):  # Start from the last row and move upwards
-        row = pixels[y * width: (y + 1) * width]
-        new_pixels.extend(row)
-    return new_pixels
+    """Flip the image vertically (a view with reversed row strides)."""
+    logger.info("Applying vertical flip")
+    image, mode = _as_image(pixels, width, height)
+    return _view(image[::-1], mode)
 
 def diagonal_flip(pixels, width, height):
-    """Flip the image diagonally by first applying a vertical flip and then a horizontal flip."""
-    ##nie wiem czy to dobrze działa :(
-    print("Applying diagonal flip (vertical flip followed by horizontal flip)")
+    """
+    Flip the image along its main diagonal (transpose), as described in the help text.
+    The result is height x width; use its .size for the new (width, height).
+    """
+    return transpose(pixels, width, height)
+
+def transpose(pixels, width, height):
+    """Mirror the image along the main diagonal: pixel (x, y) moves to (y, x)."""
+    logger.info("Applying diagonal flip (transpose)")
+    image, mode = _as_image(pixels, width, height)
+    return _view(image.swapaxes(0, 1), mode)
 
-    # Step 1: Vertical flip
-    vertical_flipped_pixels = [None] * len(pixels)
-    for y in range(height):
-        for x in range(width):
-            vertical_flipped_pixels[y * width + x] = pixels[(height - y - 1) * width + x]
+def anti_transpose(pixels, width, height):
+    """Mirror the image along the anti-diagonal (transpose followed by a 180 degree rotation)."""
+    logger.info("Applying anti-diagonal flip")
+    image, mode = _as_image(pixels, width, height)
+    return _view(image.swapaxes(0, 1)[::-1, ::-1], mode)
 
-    # Step 2: Horizontal flip
-    diagonal_flipped_pixels = [None] * len(pixels)
-    for y in range(height):
-        for x in range(width):
-            diagonal_flipped_pixels[y * width + x] = vertical_flipped_pixels[y * width + (width - x - 1)]
+def rotate_90(pixels, width, height):
+    """Rotate the image by 90 degrees counter-clockwise."""
+    logger.info("Rotating image by 90 degrees")
+    image, mode = _as_image(pixels, width, height)
+    return _view(image.swapaxes(0, 1)[::-1], mode)
 
-    return diagonal_flipped_pixels
+def rotate_180(pixels, width, height):
+    """Rotate the image by 180 degrees (vertical flip followed by a horizontal flip)."""
+    logger.info("Rotating image by 180 degrees")
+    image, mode = _as_image(pixels, width, height)
+    return _view(image[::-1, ::-1], mode)
+
+def rotate_270(pixels, width, height):
+    """Rotate the image by 270 degrees counter-clockwise (90 degrees clockwise)."""
+    logger.info("Rotating image by 270 degrees")
+    image, mode = _as_image(pixels, width, height)
+    return _view(image.swapaxes(0, 1)[:, ::-1], mode)
 
 def shrink_image(pixels, width, height, factor):
     """Shrink the image by a given factor."""
     if factor <= 0:
-        print("Error: Shrink factor must be greater than 0.")
+        logger.error("Error: Shrink factor must be greater than 0.")
         sys.exit()
-    print(f"Shrinking image by a factor of {factor}")
+    logger.info(f"Shrinking image by a factor of {factor}")
     new_width = int(width / factor)
     new_height = int(height / factor)
-    new_pixels = []
 
-    for y in range(0, height, factor):
-        for x in range(0, width, factor):
-            new_pixels.append(pixels[y * width + x])  # Pick one pixel per 'factor' block
+    # Pick one pixel per 'factor' block: a strided view, nothing is copied
+    image, mode = _as_image(pixels, width, height)
+    new_pixels = _view(image[::factor, ::factor][:new_height, :new_width], mode)
 
     return new_pixels, new_width, new_height
 
 def enlarge_image(pixels, width, height, factor):
     """Enlarge the image by a given factor."""
     if factor <= 0:
-        print("Error: Enlargement factor must be greater than 0.")
+        logger.error("Error: Enlargement factor must be greater than 0.")
         sys.exit()
-    print(f"Enlarging image by a factor of {factor}")
+    logger.info(f"Enlarging image by a factor of {factor}")
     new_width = int(width * factor)
     new_height = int(height * factor)
-    new_pixels = []
 
-    for y in range(height):
-        for _ in range(factor):  # Repeat each row 'factor' times
-            for x in range(width):
-                new_pixels.extend([pixels[y * width + x]] * factor)  # Repeat each pixel 'factor' times
+    # Repeat each row and each pixel 'factor' times
+    image, mode = _as_image(pixels, width, height)
+    new_pixels = ImageData(np.repeat(np.repeat(image, factor, axis=0), factor, axis=1), mode)
 
     return new_pixels, new_width, new_height
+
+# ---- affine warps (arbitrary rotation, shear, scale, translation) ---- #
+
+def rotation_matrix(angle, width, height, expand=False):
+    """
+    Forward affine matrix (2x3) rotating the image counter-clockwise by angle
+    degrees around its centre.
+
+    Args:
+        expand: Grow the output so the whole rotated image fits (otherwise the
+            output keeps the input size and the corners are cut off).
+
+    Returns:
+        matrix, (out_width, out_height)
+    """
+    theta = np.deg2rad(angle)
+    cos, sin = np.cos(theta), np.sin(theta)
+    out_width, out_height = width, height
+    if expand:
+        out_width = int(np.ceil(abs(width * cos) + abs(height * sin) - 1e-9))
+        out_height = int(np.ceil(abs(width * sin) + abs(height * cos) - 1e-9))
+
+    # Pixel centres are at integer coordinates; rotate around the centre of the
+    # input and move it to the centre of the output (y points down, hence -sin)
+    cx, cy = (width - 1) / 2, (height - 1) / 2
+    ox, oy = (out_width - 1) / 2, (out_height - 1) / 2
+    matrix = np.array([[cos, sin, ox - cos * cx - sin * cy],
+                       [-sin, cos, oy + sin * cx - cos * cy]])
+    return matrix, (out_width, out_height)
+
+@functools.lru_cache(maxsize=16)
+def _cached_warp_map(size, out_size, coefficients, method):
+    width, height = size
+    out_width, out_height = out_size
+    forward = np.vstack([np.array(coefficients).reshape(2, 3), [0, 0, 1]])
+    inverse = np.linalg.inv(forward)
+
+    # Source coordinates of every output pixel, computed for whole rows at once
+    xs = np.arange(out_width, dtype=np.float64)
+    ys = np.arange(out_height, dtype=np.float64)[:, None]
+    source_x = inverse[0, 0] * xs + inverse[0, 1] * ys + inverse[0, 2]
+    source_y = inverse[1, 0] * xs + inverse[1, 1] * ys + inverse[1, 2]
+
+    # The source is padded with a border of fill pixels (1 before, 2 after), so
+    # clamping into that border makes every outside sample read the fill value
+    padded_width = width + 3
+    source_x = np.clip(source_x, -1, width) + 1
+    source_y = np.clip(source_y, -1, height) + 1
+
+    if method == 'nearest':
+        index = np.floor(source_y + 0.5).astype(np.int32) * padded_width + np.floor(source_x + 0.5).astype(np.int32)
+        return (index,)
+
+    x0, y0 = np.floor(source_x), np.floor(source_y)
+    base = (y0.astype(np.int32) * padded_width + x0.astype(np.int32))
+    return base, (source_x - x0).astype(np.float32), (source_y - y0).astype(np.float32)
+
+def warp_map(size, out_size, matrix, method='bilinear'):
+    """
+    Precomputed source coordinates for warping a size = (width, height) image
+    with the forward affine matrix into out_size. Maps are cached per
+    (size, out_size, matrix, method), so warping a batch of same-size frames
+    only repeats the gather.
+
+    Returns:
+        (index,) for 'nearest' or (base index, x fraction, y fraction) for
+        'bilinear', all of shape (out_height, out_width), indexing the image
+        padded by padded_for_warp.
+    """
+    if method not in ('nearest', 'bilinear'):
+        logger.error(f"Error: Unknown interpolation '{method}'. Use nearest or bilinear.")
+        sys.exit()
+    coefficients = tuple(float(value) for value in np.asarray(matrix, dtype=np.float64)[:2].ravel())
+    return _cached_warp_map(tuple(size), tuple(out_size), coefficients, method)
+
+def padded_for_warp(image, fill=0):
+    """Image flattened to (pixels, channels) with the fill border the warp maps expect."""
+    image = np.asarray(image)
+    pad = [(1, 2), (1, 2)] + [(0, 0)] * (image.ndim - 2)
+    padded = np.pad(image, pad, constant_values=fill)
+    return padded.reshape(padded.shape[0] * padded.shape[1], -1)
+
+def apply_warp_map(image, coordinates, fill=0):
+    """Gather (and for bilinear, blend) the source pixels listed in a warp map."""
+    image = np.asarray(image)
+    source = padded_for_warp(image, fill)
+    if len(coordinates) == 1:
+        result = np.take(source, coordinates[0], axis=0)  # Nearest: a single gather, no arithmetic
+    else:
+        base, fx, fy = coordinates
+        row = image.shape[1] + 3  # Padded row length
+        fx, fy = fx[..., None], fy[..., None]
+        # Blend in float32, in place, to keep the temporaries down to a few image-sized buffers
+        top = np.take(source, base, axis=0).astype(np.float32)
+        right = np.take(source, base + 1, axis=0).astype(np.float32)
+        right -= top
+        right *= fx
+        top += right
+        bottom = np.take(source, base + row, axis=0).astype(np.float32)
+        right = np.take(source, base + row + 1, axis=0).astype(np.float32)
+        right -= bottom
+        right *= fx
+        bottom += right
+        bottom -= top
+        bottom *= fy
+        top += bottom
+        result = np.clip(np.rint(top, out=top), 0, 255, out=top).astype(np.uint8)
+    if image.ndim == 2:
+        result = result[..., 0]
+    return result
+
+def affine_warp(pixels, width, height, matrix, out_size=None, method='bilinear', fill=0):
+    """
+    Warp the image with a forward affine matrix (2x3 or 3x3) that maps input
+    pixel coordinates (x, y) to output coordinates.
+
+    Args:
+        out_size: (width, height) of the output; the input size by default.
+        method: 'nearest' or 'bilinear' sampling.
+        fill: Value of output pixels that come from outside the input.
+
+    Returns:
+        (pixels, new_width, new_height)
+    """
+    out_size = tuple(out_size or (width, height))
+    image, mode = _as_image(pixels, width, height)
+    coordinates = warp_map((width, height), out_size, matrix, method)
+    return ImageData(apply_warp_map(image, coordinates, fill), mode), out_size[0], out_size[1]
+
+def rotate_image(pixels, width, height, angle, method='bilinear', expand=False, fill=0):
+    """
+    Rotate the image counter-clockwise by any angle in degrees (e.g. to deskew scans).
+
+    Returns:
+        (pixels, new_width, new_height)
+    """
+    logger.info(f"Rotating image by {angle} degrees ({method})")
+    matrix, out_size = rotation_matrix(angle, width, height, expand)
+    return affine_warp(pixels, width, height, matrix, out_size, method, fill)
@@ -1,35 +1,152 @@
+import sys
+
+import numpy as np
 from PIL import Image
 
+from utils.image_data import ImageData, as_array
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+# Value range of the 8-bit images every histogram is taken over
+LEVELS = 256
+# Image modes histograms are taken of: a single plane (grayscale, binary as 0 / 255) or RGB
+HISTOGRAM_MODES = ('L', '1', 'RGB')
+# Bins per channel of a joint histogram when none are given (2 channels: 256 x 256, 3 channels: 32 x 32 x 32)
+JOINT_DEFAULT_BINS = {2: 256, 3: 32}
+
+
+def _pixel_values(image_pixels, mode, mask=None):
+    """Pixels as an (N,) array for one plane or (N, 3) for RGB, only those inside the mask."""
+    array = image_pixels.array if isinstance(image_pixels, ImageData) else np.asarray(image_pixels)
+    # Colour pixels have a trailing channel axis: (height, width, 3) images or flat lists of (r, g, b)
+    colour = array.ndim == 3 or (array.ndim == 2 and mode == 'RGB')
+    if mode not in HISTOGRAM_MODES or colour != (mode == 'RGB') or (colour and array.shape[-1] != 3):
+        logger.error(f"Error: Histograms need a grayscale, binary or RGB image, not mode '{mode}' "
+                     f"with pixels of shape {array.shape}.")
+        sys.exit()
+    values = array.reshape(-1, 3) if colour else array.reshape(-1)
+    if mask is not None:
+        values = values[np.asarray(mask, dtype=bool).reshape(-1)]
+    return values
 
-def calculate_histogram(image_pixels, mode):
+
+def _channel_counts(values):
+    """Histogram of every channel of (N,) or (N, channels) values as a (channels, 256) int64 array."""
+    columns = values.reshape(len(values), -1)
+    return np.stack([np.bincount(columns[:, channel], minlength=LEVELS)
+                     for channel in range(columns.shape[1])]).astype(np.int64)
+
+
+def _as_histogram(counts, mode):
+    """The list (one plane) or tuple of per-channel lists (RGB) returned by calculate_histogram."""
+    if mode != 'RGB':
+        return counts[0].tolist()
+    return tuple(channel_counts.tolist() for channel_counts in counts)
+
+
+def roi_mask(size, box):
     """
-    Calculate the histogram based on the image mode (grayscale or RGB).
-    Returns the histogram data for each channel (if RGB) or a single histogram (if grayscale).
+    Boolean (height, width) mask that selects a rectangle of the image.
+
+    Args:
+        size: Tuple (width, height) of the image.
+        box: (x0, y0, x1, y1), the corners of the rectangle; x1 and y1 are exclusive.
     """
-    histogram = [0] * 256  # Initialize a list of 256 zeros for histogram counts
+    width, height = size
+    x0, y0, x1, y1 = box
+    if not (0 <= x0 < x1 <= width and 0 <= y0 < y1 <= height):
+        logger.error(f"Error: The region {box} is empty or outside the {width}x{height} image.")
+        sys.exit()
+    mask = np.zeros((height, width), dtype=bool)
+    mask[y0:y1, x0:x1] = True
+    return mask
 
-    if mode == 'L':  # Grayscale image
-        # Iterate over each pixel and update the histogram
-        for pixel in image_pixels:
-            histogram[pixel] += 1
-        return histogram
 
-    elif mode == 'RGB':  # RGB image
-        # Separate histograms for red, green, and blue channels
-        r_histogram = [0] * 256
-        g_histogram = [0] * 256
-        b_histogram = [0] * 256
+def calculate_histogram(image_pixels, mode, mask=None):
+    """
+    Calculate the histogram based on the image mode (grayscale, binary or RGB).
+    Returns the histogram data for each channel (if RGB) or a single histogram (otherwise).
+    With a mask (boolean, one value per pixel, e.g. from roi_mask) only the selected pixels are counted.
+    """
+    return _as_histogram(_channel_counts(_pixel_values(image_pixels, mode, mask)), mode)
 
-        for pixel in image_pixels:
-            r, g, b = pixel
-            r_histogram[r] += 1
-            g_histogram[g] += 1
-            b_histogram[b] += 1
 
-        return r_histogram, g_histogram, b_histogram
+def joint_histogram(image_pixels, mode, channels=(0, 1), bins=None, mask=None):
+    """
+    Joint histogram of two or three colour channels.
+
+    Args:
+        image_pixels: Colour image (ImageData, array or flat list of tuples).
+        mode: Image mode ('RGB', ...).
+        channels: Indices of the 2 or 3 channels to combine, e.g. (0, 1) for red-green.
+        bins: Bins per channel, each covering 256 / bins levels (default: 256 for
+            two channels, 32 for three).
+        mask: Optional boolean mask of the pixels to count.
+
+    Returns:
+        int64 array of shape (bins, bins) or (bins, bins, bins); entry [i, j(, k)]
+        counts the pixels whose first channel falls in bin i, second in bin j, ...
+    """
+    if mode != 'RGB' or len(channels) not in JOINT_DEFAULT_BINS or not set(channels) <= {0, 1, 2}:
+        logger.error("Error: A joint histogram needs 2 or 3 of the channels 0, 1, 2 of an RGB image.")
+        sys.exit()
+    bins = bins or JOINT_DEFAULT_BINS[len(channels)]
+    if not 1 <= bins <= LEVELS:
+        logger.error(f"Error: The number of bins must be between 1 and {LEVELS}.")
+        sys.exit()
+
+    values = _pixel_values(image_pixels, mode, mask)
+    # Bin of every pixel in every channel, folded into one index: ((b0 * bins) + b1) * bins + b2
+    index = np.zeros(len(values), dtype=np.intp)
+    for channel in channels:
+        index *= bins
+        index += values[:, channel].astype(np.intp) * bins // LEVELS
+    return np.bincount(index, minlength=bins ** len(channels)).reshape((bins,) * len(channels))
+
+
+class IncrementalHistogram:
+    """
+    Histogram of an image that is kept up to date while regions of the image change.
 
+    The tracker holds its own copy of the image. update() writes a new region into
+    it and only recounts that region (its old pixels are removed from the counts
+    and the new ones added), so an edit costs as much as the region, not the image.
+    add() and remove() adjust the counts directly, e.g. for a sliding window.
+    """
 
-def save_histogram_image(image_pixels, mode, output_path="histogram.png", channels=None):
+    def __init__(self, image_pixels, mode, size):
+        self.mode = mode
+        self.image = ImageData(np.array(as_array(image_pixels, mode, size), dtype=np.uint8), mode)
+        self.counts = _channel_counts(_pixel_values(self.image, mode))
+
+    def add(self, region):
+        """Count the pixels of a region (array of shape (h, w) or (h, w, channels))."""
+        self.counts += _channel_counts(_pixel_values(np.asarray(region, dtype=np.uint8), self.mode))
+
+    def remove(self, region):
+        """Take the pixels of a region out of the counts."""
+        self.counts -= _channel_counts(_pixel_values(np.asarray(region, dtype=np.uint8), self.mode))
+
+    def update(self, x, y, region):
+        """Replace the pixels at (x, y) (top-left corner) with region and update the counts."""
+        region = np.asarray(region, dtype=np.uint8)
+        target = self.image.array[y:y + region.shape[0], x:x + region.shape[1]]
+        if target.shape != region.shape:
+            logger.error(f"Error: A {region.shape[1]}x{region.shape[0]} region at ({x}, {y}) "
+                         f"does not fit in the {self.image.width}x{self.image.height} image.")
+            sys.exit()
+        self.remove(target)
+        self.add(region)
+        target[...] = region
+
+    def histogram(self):
+        """The current histogram in the format of calculate_histogram."""
+        return _as_histogram(self.counts, self.mode)
+
+
+def save_histogram_image(image_pixels, mode, output_path="histogram.png", channels=None, mask=None):
     """
     Given the image pixels and mode, calculate the histogram and save it as an image.
     """
@@ -40,7 +157,7 @@ def save_histogram_image(image_pixels, mode, output_path="histogram.png", channe
     pixel_data = image.load()
 
     # Calculate the histogram for grayscale or RGB image
-    histogram_data = calculate_histogram(image_pixels, mode)
+    histogram_data = calculate_histogram(image_pixels, mode, mask)
 
     if isinstance(histogram_data, tuple):  # If the histogram data contains R, G, and B channels
         red_hist, green_hist, blue_hist = histogram_data
@@ -87,4 +204,16 @@ def save_histogram_image(image_pixels, mode, output_path="histogram.png", channe
 
     # Save the histogram image
     image.save(output_path)
-    print(f"Histogram saved as: {output_path}")
+    logger.info(f"Histogram saved as: {output_path}")
+
+
+def save_joint_histogram_image(image_pixels, mode, output_path="joint_histogram.png", channels=(0, 1), mask=None):
+    """
+    Save the joint histogram of two channels as a 256x256 image: the first channel
+    runs along x, the second along y (0 at the bottom), darker = more pixels (log scale).
+    """
+    counts = joint_histogram(image_pixels, mode, channels, LEVELS, mask)
+    shade = np.log1p(counts) / max(np.log1p(counts.max()), 1)
+    image = Image.fromarray((255 - np.rint(shade * 255)).astype(np.uint8).T[::-1], 'L')
+    image.save(output_path)
+    logger.info(f"Joint histogram saved as: {output_path}")
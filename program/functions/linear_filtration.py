@@ -56,9 +56,9 @@ def universal_convolution(pixels, size, args_dict):
     
     # Step 4: Convert the pixels into a numpy array for easier manipulation
     if isinstance(pixels[0], tuple):  # RGB
-        image_array = np.array(pixels).reshape((size[1], size[0], 3))
+        image_array = np.array(pixels, dtype=int).reshape((size[1], size[0], 3))
     else:  # Grayscale
-        image_array = np.array(pixels).reshape((size[1], size[0]))
+        image_array = np.array(pixels, dtype=int).reshape((size[1], size[0]))
     
     # Step 5: Create an output array for the result
     output_array = np.zeros_like(image_array)
@@ -95,9 +95,9 @@ def optimized_convolution(pixels, size):
     # Check if the image is RGB or Grayscale and reshape accordingly
     is_rgb = isinstance(pixels[0], tuple)
     if is_rgb:  # RGB
-        image_array = np.array(pixels).reshape((size[1], size[0], 3))
+        image_array = np.array(pixels, dtype=int).reshape((size[1], size[0], 3))
     else:  # Grayscale
-        image_array = np.array(pixels).reshape((size[1], size[0]))
+        image_array = np.array(pixels, dtype=int).reshape((size[1], size[0]))
     
     # Calculate padding size
     pad_y, pad_x = mask.shape[0] // 2, mask.shape[1] // 2
@@ -7,6 +7,9 @@ from numpy import convolve
 from utils.file_operations import save_image
 from functions.fourier import save_magnitude_spectrum, fast_fft
 from functions.fourier import save_magnitude_spectrum, fast_fft, fast_ifft
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def apply_low_pass_filter(frequency_data, cutoff_frequency):
@@ -122,7 +125,7 @@ def process_and_save_filtered(frequency_data, size, mode, output_base_path, filt
 
     reconstructed_output_path = f"{output_base_path}_{filter_type}.bmp"
     save_image(reconstructed_pixels, mode, size, reconstructed_output_path)
-    print(f"Reconstructed {filter_type} image saved to '{reconstructed_output_path}'.")
+    logger.info(f"Reconstructed {filter_type} image saved to '{reconstructed_output_path}'.")
 
 
 
@@ -1,5 +1,9 @@
 import numpy as np
 
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
 def dilation(image, kernel):
     """
     Perform the dilation operation on a binary image, handling `-1` in the kernel.
@@ -112,26 +116,21 @@ def hitOrMiss(image, foreground_kernel, background_kernel=None):
 
     # Erode the image with the foreground kernel (this matches foreground pixels)
     eroded_foreground = erosion(image, foreground_kernel)
-    print("Eroded Foreground")
-    print(eroded_foreground)
+    logger.debug("Eroded Foreground\n%s", eroded_foreground)
 
     if background_kernel is not None:
         # Invert the image for the background kernel (background becomes foreground)
-        print("Original image")
-        print(image)
+        logger.debug("Original image\n%s", image)
         inverted_image = np.logical_not(image)
-        print("inverted image:")
-        print(inverted_image)
+        logger.debug("inverted image:\n%s", inverted_image)
 
         # Erode the inverted image with the background kernel (this matches background pixels)
         eroded_background = erosion(inverted_image, background_kernel)
-        print("Eroded Background")
-        print(eroded_background)
+        logger.debug("Eroded Background\n%s", eroded_background)
 
         # Combine the results using logical AND
         result = np.logical_and(eroded_foreground, eroded_background)
-        print("Result:")
-        print(result)
+        logger.debug("Result:\n%s", result)
     else:
         # If no background kernel is provided, use only the foreground erosion
         result = eroded_foreground
@@ -146,12 +145,8 @@ def iterative_dilation(image, p, kernel):
     """
     # Initialize the set X_0, which is just the point p
     X_k = np.zeros_like(image)
-    print('X_k')
-    print(X_k)
-    print(' X_k[p[0], p[1]]')
-    print( X_k[p[0], p[1]])
-    print('p')
-    print(p)
+    logger.debug('X_k\n%s', X_k)
+    logger.debug('p = %s, X_k[p[0], p[1]] = %s', p, X_k[p[0], p[1]])
 
     X_k[p[0], p[1]] = 1  # Set the initial point as 1 (foreground)
 
@@ -159,13 +154,11 @@ def iterative_dilation(image, p, kernel):
     while True:
         # Dilate the current set X_k with the kernel
         X_k_next = dilation(X_k, kernel)
-        print('X_k_next before intersect')
-        print(X_k_next)
+        logger.debug('X_k_next before intersect\n%s', X_k_next)
 
         # Intersect with the original image A (this is equivalent to X_k = (X_k ⊕ B) ∩ A)
         X_k_next = X_k_next & image
-        print('X_k_next after intersect')
-        print(X_k_next)
+        logger.debug('X_k_next after intersect\n%s', X_k_next)
 
         # Check if the set has stabilized (X_k == X_k_next)
         if np.array_equal(X_k, X_k_next):
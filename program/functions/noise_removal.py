@@ -1,65 +1,282 @@
-import math
+import numpy as np
+
+from utils.image_data import ImageData, as_array
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+GMEAN_TOLERANCE = 1e-6
+VECTOR_BLOCK_ROWS = 64  # Rows per block of the vector median (bounds the distance planes kept in memory)
+
+
+def _channel_planes(pixels, width, height):
+    """The image as (height, width, channels) uint8 array plus its mode."""
+    mode = pixels.mode if isinstance(pixels, ImageData) else None
+    image = np.asarray(as_array(pixels, mode, (width, height)))
+    if image.ndim == 2:
+        image = image[:, :, None]
+    return image.astype(np.uint8, copy=False), mode
+
+
+def _from_planes(image, mode):
+    """Inverse of _channel_planes: drop the channel axis again for single-channel images."""
+    return ImageData(image[:, :, 0] if image.shape[2] == 1 else image, mode)
+
+
+def window_histograms(plane, radius):
+    """
+    Yield, row by row, the 256-bin histograms of every (2 * radius + 1)^2
+    window of a uint8 plane, as an int32 array of shape (width, 256).
+
+    Borders are edge-clamped, like the original per-pixel filters. One
+    histogram per image column covers the 2 * radius + 1 rows of the current
+    window row; moving down a row removes one pixel from each column
+    histogram and adds one (Huang / Perreault). Window histograms are
+    differences of a running sum over the column histograms, so the cost per
+    pixel does not depend on the kernel size.
+    """
+    height, width = plane.shape
+    diameter = 2 * radius + 1
+    padded = np.pad(plane, radius, mode='edge')
+    padded_width = width + 2 * radius
+    columns = np.arange(padded_width)
+
+    column_histograms = np.zeros((padded_width, 256), dtype=np.int32)
+    for row in padded[:diameter]:
+        column_histograms[columns, row] += 1
+
+    prefix = np.zeros((padded_width + 1, 256), dtype=np.int32)
+    for y in range(height):
+        if y:
+            column_histograms[columns, padded[y - 1]] -= 1  # Row leaving the window
+            column_histograms[columns, padded[y + diameter - 1]] += 1  # Row entering it
+        np.cumsum(column_histograms, axis=0, out=prefix[1:])
+        yield prefix[diameter:] - prefix[:width]
+
+
+def rank_values(cumulative_counts, rank):
+    """Value of the rank-th smallest element (1-based) of each histogram, from its cumulative counts."""
+    # Number of bins whose cumulative count is still below the rank
+    return np.count_nonzero(cumulative_counts < rank, axis=1)
+
+
+def rank_sums(cumulative_counts, cumulative_sums, rank):
+    """
+    Sum of the rank smallest values of each histogram, from its cumulative
+    counts and cumulative value sums (both of shape (pixels, 256)).
+    """
+    if rank == 0:
+        return np.zeros(len(cumulative_counts), dtype=np.int64)
+    value = rank_values(cumulative_counts, rank)
+    rows = np.arange(len(value))
+    previous = np.maximum(value - 1, 0)
+    count_below = np.where(value > 0, cumulative_counts[rows, previous], 0)
+    sum_below = np.where(value > 0, cumulative_sums[rows, previous], 0)
+    return sum_below + (rank - count_below) * value
+
 
 def alpha_trimmed_mean_filter(pixels, width, height, kernel_size, alpha):
-    """Apply alpha-trimmed mean filter to the image."""
-    print(f"Applying Alpha-trimmed Mean Filter with alpha={alpha} and kernel size={kernel_size}")
-    new_pixels = []
+    """
+    Apply alpha-trimmed mean filter to the image: drop the alpha smallest and
+    alpha largest values of every neighbourhood and average the rest (per channel,
+    i.e. the marginal trimmed mean on colour images).
+    Uses sliding window histograms, so 7x7 and 9x9 kernels cost about as much as 3x3.
+    """
+    logger.info(f"Applying Alpha-trimmed Mean Filter with alpha={alpha} and kernel size={kernel_size}")
     k = kernel_size // 2  # kernel radius
+    window = (2 * k + 1) ** 2
+    trim_count = min(alpha, window // 2)
+    kept = window - 2 * trim_count
+
+    image, mode = _channel_planes(pixels, width, height)
+    result = np.empty_like(image)
+    values = np.arange(256, dtype=np.int32)
+    for channel in range(image.shape[2]):
+        for y, histograms in enumerate(window_histograms(image[:, :, channel], k)):
+            counts = np.cumsum(histograms, axis=1)
+            sums = np.cumsum(histograms * values, axis=1)
+            # Sum of the values ranked trim_count + 1 .. window - trim_count
+            trimmed_sum = rank_sums(counts, sums, window - trim_count) - rank_sums(counts, sums, trim_count)
+            result[y, :, channel] = trimmed_sum // kept
+
+    return _from_planes(result, mode)
 
-    for y in range(height):
-        for x in range(width):
-            # Extract the neighborhood
-            neighborhood = []
-            for ky in range(-k, k + 1):
-                for kx in range(-k, k + 1):
-                    ny = min(max(y + ky, 0), height - 1)
-                    nx = min(max(x + kx, 0), width - 1)
-                    neighborhood.append(pixels[ny * width + nx])
-
-            # Sort and trim extremes based on alpha
-            neighborhood.sort()
-            trim_count = min(alpha, len(neighborhood) // 2)
-            trimmed_neighborhood = neighborhood[trim_count: len(neighborhood) - trim_count]
-
-            # Compute the mean of the remaining values
-            if isinstance(trimmed_neighborhood[0], int):  # Grayscale image
-                avg_value = sum(trimmed_neighborhood) // len(trimmed_neighborhood)
-                new_pixels.append(avg_value)
-            else:  # RGB image
-                avg_pixel = tuple(
-                    sum(channel_values) // len(trimmed_neighborhood) for channel_values in zip(*trimmed_neighborhood))
-                new_pixels.append(avg_pixel)
-
-    return new_pixels
+
+def _window_sums(planes, k):
+    """Sum of every (2k+1)^2 edge-clamped window of a (height, width, channels) array, via an integral image."""
+    diameter = 2 * k + 1
+    padded = np.pad(planes, ((k, k), (k, k), (0, 0)), mode='edge')
+
+    # Integral image with a leading row and column of zeros
+    integral = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1, padded.shape[2]))
+    np.cumsum(np.cumsum(padded, axis=0), axis=1, out=integral[1:, 1:])
+    return (integral[diameter:, diameter:] - integral[:-diameter, diameter:]
+            - integral[diameter:, :-diameter] + integral[:-diameter, :-diameter])
 
 
 def geometric_mean_filter(pixels, width, height, kernel_size):
-    """Apply geometric mean filter to the image."""
-    print(f"Applying Geometric Mean Filter with kernel size={kernel_size}")
-    new_pixels = []
+    """
+    Apply geometric mean filter to the image: exp of the mean log of every
+    neighbourhood (edge-clamped, per channel).
+
+    Logs are taken once per pixel and summed with an integral image, so each
+    window costs O(1) whatever the kernel size, and nothing overflows (the
+    old running product reached 255^81 for 9x9 kernels).
+
+    Zero pixels are left out of the mean: their log is -inf, so a single zero
+    (pepper noise, or Gaussian noise clipped at 0) would otherwise turn its
+    whole window black. Each window averages the logs of its non-zero pixels,
+    counted with a second integral image; a window of zeros only stays 0.
+    """
+    logger.info(f"Applying Geometric Mean Filter with kernel size={kernel_size}")
     k = kernel_size // 2  # kernel radius
 
-    for y in range(height):
-        for x in range(width):
-            # Extract the neighborhood
-            neighborhood = []
-            for ky in range(-k, k + 1):
-                for kx in range(-k, k + 1):
-                    ny = min(max(y + ky, 0), height - 1)
-                    nx = min(max(x + kx, 0), width - 1)
-                    neighborhood.append(pixels[ny * width + nx])
-
-            # Compute the geometric mean
-            if isinstance(neighborhood[0], int):  # Grayscale image
-                # Handle zeros by adding a small value (if needed)
-                product = math.prod([max(val, 1e-10) for val in neighborhood])
-                gmean_value = int(math.pow(product, 1 / len(neighborhood)))
-                new_pixels.append(gmean_value)
-            else:  # RGB image
-                gmean_pixel = tuple(
-                    int(math.pow(math.prod([max(val, 1e-10) for val in channel_values]), 1 / len(neighborhood)))
-                    for channel_values in zip(*neighborhood)
-                )
-                new_pixels.append(gmean_pixel)
-
-    return new_pixels
+    image, mode = _channel_planes(pixels, width, height)
+    nonzero = image > 0
+    logs = np.log(np.where(nonzero, image, 1), dtype=np.float64)  # Zeros contribute log(1) = 0 to the sums...
+    log_sums = _window_sums(logs, k)
+    counts = _window_sums(nonzero.astype(np.float64), k)  # ...and nothing to the counts
+
+    # GMEAN_TOLERANCE absorbs the rounding of the sums, so flat areas do not drop to the integer below
+    means = np.exp(log_sums / np.maximum(counts, 1))
+    result = np.where(counts > 0.5, np.floor(means + GMEAN_TOLERANCE), 0)
+    return _from_planes(np.clip(result, 0, 255).astype(np.uint8), mode)
+
+
+def median_filter(pixels, width, height, kernel_size):
+    """
+    Apply median filter to the image (edge-clamped, per channel), reading the
+    median from the sliding window histograms, so the cost does not depend
+    on the kernel size.
+    """
+    logger.info(f"Applying Median Filter with kernel size={kernel_size}")
+    k = kernel_size // 2  # kernel radius
+    middle_rank = (2 * k + 1) ** 2 // 2 + 1
+
+    image, mode = _channel_planes(pixels, width, height)
+    result = np.empty_like(image)
+    for channel in range(image.shape[2]):
+        for y, histograms in enumerate(window_histograms(image[:, :, channel], k)):
+            result[y, :, channel] = rank_values(np.cumsum(histograms, axis=1), middle_rank)
+
+    return _from_planes(result, mode)
+
+
+def adaptive_median_filter(pixels, width, height, max_kernel_size=7):
+    """
+    Apply adaptive median filter to the image (per channel).
+
+    Every pixel starts with a 3x3 window. If the window median is itself an
+    extreme (equal to the window min or max, i.e. probably impulse noise), the
+    window grows by 2 up to max_kernel_size. Once the median is not an
+    extreme, the pixel keeps its own value unless it is an extreme, in which
+    case it is replaced by the median. Pixels that reach max_kernel_size get the
+    median of the largest window.
+
+    Each window size is evaluated for all still-undecided pixels at once; on
+    lightly corrupted images almost all of them are settled by the 3x3 pass.
+    """
+    logger.info(f"Applying Adaptive Median Filter with max kernel size={max_kernel_size}")
+    max_k = max(max_kernel_size // 2, 1)
+
+    image, mode = _channel_planes(pixels, width, height)
+    result = image.copy()
+    for channel in range(image.shape[2]):
+        plane = image[:, :, channel]
+        padded = np.pad(plane, max_k, mode='edge')
+        # Undecided pixels, as flat coordinates
+        ys, xs = np.divmod(np.arange(width * height), width)
+
+        for k in range(1, max_k + 1):
+            size = 2 * k + 1
+            # Windows of the undecided pixels only, gathered from the padded plane
+            windows = np.lib.stride_tricks.sliding_window_view(padded, (size, size))
+            offset = max_k - k
+            neighbourhoods = windows[ys + offset, xs + offset].reshape(len(ys), -1)
+
+            middle = size * size // 2
+            neighbourhoods.partition(middle, axis=1)
+            median = neighbourhoods[:, middle]
+            low = neighbourhoods[:, :middle].min(axis=1)
+            high = neighbourhoods[:, middle + 1:].max(axis=1)
+
+            # Stage A: is the median an impulse itself?
+            settled = (low < median) & (median < high)
+            # Stage B: keep the pixel unless it is an extreme of the window
+            current = plane[ys, xs]
+            value = np.where(settled & (low < current) & (current < high), current, median)
+            if k == max_k:
+                settled[:] = True  # Window cannot grow any more: the median it is
+
+            result[ys[settled], xs[settled], channel] = value[settled]
+            ys, xs = ys[~settled], xs[~settled]
+            if not len(ys):
+                break
+
+    return _from_planes(result, mode)
+
+
+def vector_median_filter(pixels, width, height, kernel_size):
+    """
+    Apply vector median filter to the image: every pixel becomes the colour
+    of its neighbourhood with the smallest sum of Euclidean (RGB) distances
+    to all the other colours of the neighbourhood (edge-clamped).
+
+    Unlike per-channel filters it never creates colours that are not in the
+    window. Ties go to the first such pixel in row-major window order.
+    On grayscale images it is the same as the median filter.
+    """
+    logger.info(f"Applying Vector Median Filter with kernel size={kernel_size}")
+    k = kernel_size // 2  # kernel radius
+
+    image, mode = _channel_planes(pixels, width, height)
+    # Window members reach k pixels past the image, their partners another 2k
+    padded = np.pad(image.astype(np.int32), ((3 * k, 3 * k), (3 * k, 3 * k), (0, 0)), mode='edge')
+    result = np.empty_like(image)
+    for y0 in range(0, height, VECTOR_BLOCK_ROWS):
+        rows = min(VECTOR_BLOCK_ROWS, height - y0)
+        result[y0:y0 + rows] = _vector_median_rows(padded[y0:y0 + rows + 6 * k], rows, width, k)
+
+    return _from_planes(result, mode)
+
+
+def _vector_median_rows(padded, rows, width, k):
+    """Vector median of a block of output rows (padded by 3k on every side)."""
+    diameter = 2 * k + 1
+    member_rows, member_cols = rows + 2 * k, width + 2 * k
+    origin = 2 * k
+
+    # Distance of every member position to the pixel (dy, dx) away, computed once for the whole block
+    # instead of per window; (-dy, -dx) is the same plane read from the partner's position
+    distances = {}
+    for dy in range(0, 2 * k + 1):
+        for dx in range(-2 * k, 2 * k + 1):
+            if dy == 0 and dx <= 0:
+                continue
+            diff = (padded[origin:origin + member_rows, origin:origin + member_cols]
+                    - padded[origin + dy:origin + dy + member_rows, origin + dx:origin + dx + member_cols])
+            distances[dy, dx] = np.sqrt(np.einsum('ijc,ijc->ij', diff, diff).astype(np.float32))
+
+    best_total = None
+    best = None
+    for a in range(diameter):
+        for b in range(diameter):
+            # Sum of distances from window member (a, b) to all the others, for every window at once
+            total = np.zeros((rows, width), dtype=np.float32)
+            for c in range(diameter):
+                for e in range(diameter):
+                    dy, dx = c - a, e - b
+                    if (dy, dx) in distances:
+                        total += distances[dy, dx][a:a + rows, b:b + width]
+                    elif (-dy, -dx) in distances:
+                        total += distances[-dy, -dx][c:c + rows, e:e + width]
+
+            member = padded[origin + a:origin + a + rows, origin + b:origin + b + width]
+            if best is None:
+                best_total, best = total, member.copy()
+            else:
+                closer = total < best_total
+                best_total = np.where(closer, total, best_total)
+                best = np.where(closer[:, :, None], member, best)
+
+    return best
@@ -0,0 +1,230 @@
+import sys
+
+import numpy as np
+
+from functions.geometric import rotation_matrix, affine_warp
+from functions.elementary import brightness_lut, contrast_lut, negative_lut, compose_luts, apply_lut
+from functions.resampling import RESAMPLING_FILTERS, resample
+from utils.file_operations import save_image
+from utils.image_data import ImageData, as_array
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class ImagePipeline:
+    """
+    Lazy chain of the task1 point and geometric operations.
+
+    Operations are only recorded; nothing is computed until materialize()
+    or save() is called. At that point the pending operations are fused:
+
+    - point operations (brightness, contrast, negative) become one LUT,
+    - flips, transposes, rotations, shrink and enlarge only select, repeat
+      or swap source rows and columns, so they collapse into one row map,
+      one column map and a transposed flag (e.g. hflip followed by vflip
+      is a single 180 degree remap),
+    - since a LUT commutes with pure pixel selection, it is applied on
+      whichever side of the remap has fewer pixels (after a shrink,
+      before an enlarge).
+
+    Filtered resizes (resize) and rotations by angles that are not a multiple
+    of 90 degrees interpolate between pixels, so they split the chain: the
+    operations before them are fused and run first.
+
+    The materialized result is cached, so consecutive save points only pay
+    for the operations recorded since the previous one.
+    """
+
+    def __init__(self, pixels, mode, size):
+        self.mode = mode
+        self._image = as_array(pixels, mode, size)
+        self._pending = []
+
+    @property
+    def size(self):
+        """(width, height) of the image after all recorded operations."""
+        height, width = self._image.shape[:2]
+        for op, value in self._pending:
+            if op == 'transpose':
+                width, height = height, width
+            elif op == 'shrink':
+                width, height = int(width / value), int(height / value)
+            elif op == 'enlarge':
+                width, height = width * value, height * value
+            elif op == 'resize':
+                width, height = value[0]
+            elif op == 'warp':
+                _, (width, height) = rotation_matrix(value[0], width, height, value[2])
+        return width, height
+
+    # ---- recorded operations ---- #
+
+    def brightness(self, factor):
+        logger.info(f"Adjusting brightness by a factor of {factor}")
+        self._pending.append(('lut', brightness_lut(factor)))
+        return self
+
+    def contrast(self, factor):
+        logger.info(f"Adjusting contrast by a factor of {factor}")
+        self._pending.append(('lut', contrast_lut(factor)))
+        return self
+
+    def negative(self):
+        logger.info("Applying negative filter")
+        self._pending.append(('lut', negative_lut()))
+        return self
+
+    def hflip(self):
+        logger.info("Applying horizontal flip")
+        self._pending.append(('hflip', None))
+        return self
+
+    def vflip(self):
+        logger.info("Applying vertical flip")
+        self._pending.append(('vflip', None))
+        return self
+
+    def dflip(self):
+        logger.info("Applying diagonal flip (transpose)")
+        self._pending.append(('transpose', None))
+        return self
+
+    def adflip(self):
+        logger.info("Applying anti-diagonal flip")
+        self._pending += [('transpose', None), ('vflip', None), ('hflip', None)]
+        return self
+
+    def rotate(self, degrees, method='bilinear', expand=False):
+        """
+        Rotate counter-clockwise. Multiples of 90 degrees are exact remaps; other
+        angles are warped with nearest or bilinear sampling (expand grows the
+        output to fit the whole rotated image).
+        """
+        if degrees % 90:
+            if method not in ('nearest', 'bilinear'):
+                logger.error(f"Error: Unknown interpolation '{method}'. Use nearest or bilinear.")
+                sys.exit()
+            logger.info(f"Rotating image by {degrees} degrees ({method})")
+            self._pending.append(('warp', (degrees, method, expand)))
+            return self
+        degrees = int(degrees)
+        logger.info(f"Rotating image by {degrees % 360} degrees")
+        self._pending += {
+            0: [],
+            90: [('transpose', None), ('vflip', None)],
+            180: [('vflip', None), ('hflip', None)],
+            270: [('transpose', None), ('hflip', None)],
+        }[degrees % 360]
+        return self
+
+    def shrink(self, factor):
+        if factor <= 0:
+            logger.error("Error: Shrink factor must be greater than 0.")
+            sys.exit()
+        logger.info(f"Shrinking image by a factor of {factor}")
+        self._pending.append(('shrink', factor))
+        return self
+
+    def enlarge(self, factor):
+        if factor <= 0:
+            logger.error("Error: Enlargement factor must be greater than 0.")
+            sys.exit()
+        logger.info(f"Enlarging image by a factor of {factor}")
+        self._pending.append(('enlarge', factor))
+        return self
+
+    def resize(self, new_size, method='bilinear'):
+        """Resample to new_size = (width, height) with a box, bilinear, bicubic or lanczos filter."""
+        if method not in RESAMPLING_FILTERS:
+            logger.error(f"Error: Unknown resampling method '{method}'. Use one of: {', '.join(RESAMPLING_FILTERS)}.")
+            sys.exit()
+        logger.info(f"Resizing image to {new_size[0]}x{new_size[1]} ({method})")
+        self._pending.append(('resize', ((int(new_size[0]), int(new_size[1])), method)))
+        return self
+
+    def scale(self, factor, method='bilinear'):
+        """Resample by any positive factor, e.g. 0.25 or 1.5."""
+        if factor <= 0:
+            logger.error("Error: Scale factor must be greater than 0.")
+            sys.exit()
+        width, height = self.size
+        return self.resize((max(1, round(width * factor)), max(1, round(height * factor))), method)
+
+    # ---- materialization ---- #
+
+    def materialize(self):
+        """Run the pending operations as one fused pass and return the ImageData."""
+        if self._pending:
+            self._image = self._run(self._image, self._pending)
+            self._pending = []
+        return ImageData(self._image, self.mode)
+
+    def save(self, output_path):
+        """Explicit save point: materialize and write the image."""
+        save_image(self.materialize(), self.mode, self.size, output_path)
+
+    def _run(self, image, operations):
+        segment = []
+        for op, value in operations:
+            if op == 'resize':
+                image = self._run_fused(image, segment)
+                segment = []
+                new_size, method = value
+                image = resample(image, (image.shape[1], image.shape[0]), new_size, method, self.mode).array
+            elif op == 'warp':
+                image = self._run_fused(image, segment)
+                segment = []
+                degrees, method, expand = value
+                height, width = image.shape[:2]
+                matrix, out_size = rotation_matrix(degrees, width, height, expand)
+                image = affine_warp(image, width, height, matrix, out_size, method)[0].array
+            else:
+                segment.append((op, value))
+        return self._run_fused(image, segment)
+
+    @staticmethod
+    def _run_fused(image, operations):
+        if not operations:
+            return image
+        height, width = image.shape[:2]
+        rows = np.arange(height)  # Source index for every output row
+        cols = np.arange(width)  # Source index for every output column
+        transposed = False  # True when output rows index source columns and vice versa
+        lut = None
+
+        for op, value in operations:
+            if op == 'lut':
+                lut = value if lut is None else compose_luts(lut, value)
+            elif op == 'hflip':
+                cols = cols[::-1]
+            elif op == 'vflip':
+                rows = rows[::-1]
+            elif op == 'transpose':
+                rows, cols = cols, rows
+                transposed = not transposed
+            elif op == 'shrink':
+                # Keep one pixel per factor block, as shrink_image does
+                rows = rows[::value][:int(len(rows) / value)]
+                cols = cols[::value][:int(len(cols) / value)]
+            elif op == 'enlarge':
+                rows = np.repeat(rows, value)
+                cols = np.repeat(cols, value)
+
+        if transposed:
+            rows, cols = cols, rows  # Back to source rows / columns; the axes are swapped after the gather
+        identity = (not transposed and len(rows) == height and len(cols) == width
+                    and np.array_equal(rows, np.arange(height))
+                    and np.array_equal(cols, np.arange(width)))
+        shrinks = len(rows) * len(cols) < height * width
+
+        if lut is not None and not shrinks:
+            image = apply_lut(image, lut)
+        if not identity:
+            image = image[np.ix_(rows, cols)]  # Single gather for all geometric ops
+            if transposed:
+                image = np.ascontiguousarray(image.swapaxes(0, 1))
+        if lut is not None and shrinks:
+            image = apply_lut(image, lut)
+        return image
+
@@ -0,0 +1,156 @@
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from functions.resampling import resample
+from utils.cache import image_digest
+from utils.image_data import ImageData, as_array
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 5-tap binomial approximation of a Gaussian (Burt & Adelson)
+GAUSSIAN_TAPS = np.array([1, 4, 6, 4, 1], dtype=np.float32) / 16
+
+# Pyramids of recently used images, most recently used last
+MAX_CACHED_PYRAMIDS = 8
+_pyramids = OrderedDict()
+
+
+def reduce_box(image):
+    """Halve an image by averaging 2x2 blocks (odd sizes repeat their last row / column)."""
+    image = np.asarray(image, dtype=np.float32)
+    height, width = image.shape[:2]
+    if height % 2 or width % 2:
+        pad = [(0, height % 2), (0, width % 2)] + [(0, 0)] * (image.ndim - 2)
+        image = np.pad(image, pad, mode='edge')
+    return (image[0::2, 0::2] + image[1::2, 0::2] + image[0::2, 1::2] + image[1::2, 1::2]) * 0.25
+
+
+def reduce_gaussian(image):
+    """Halve an image with a separable 5-tap Gaussian blur followed by taking every second pixel."""
+    image = np.asarray(image, dtype=np.float32)
+    for axis in (0, 1):
+        pad = [(0, 0)] * image.ndim
+        pad[axis] = (2, 2)
+        padded = np.pad(image, pad, mode='reflect' if image.shape[axis] > 2 else 'edge')
+        length = (image.shape[axis] + 1) // 2
+        # Only the kept (even) positions are blurred
+        blurred = 0
+        for tap, weight in enumerate(GAUSSIAN_TAPS):
+            blurred = blurred + weight * np.take(padded, np.arange(length) * 2 + tap, axis=axis)
+        image = blurred
+    return image
+
+
+REDUCE_METHODS = {'box': reduce_box, 'gaussian': reduce_gaussian}
+
+
+class ImagePyramid:
+    """
+    Mipmap of an image: level 0 is the full-resolution image and every
+    further level has half the width and height of the previous one.
+
+    Level 0 is the source array itself (no copy). Further levels are built
+    on first use and kept as float32, so deeper levels are reduced from an
+    unrounded parent. Building all of them costs about 1/3
+    of one pass over the full-resolution image (1/4 + 1/16 + ...).
+    """
+
+    def __init__(self, pixels, mode, size, method='box', min_size=1):
+        if method not in REDUCE_METHODS:
+            logger.error(f"Error: Unknown pyramid method '{method}'. Use one of: {', '.join(REDUCE_METHODS)}.")
+            sys.exit()
+        self.mode = mode
+        self.method = method
+        self.min_size = min_size
+        self._levels = [as_array(pixels, mode, size)]
+
+    @property
+    def depth(self):
+        """Number of levels down to min_size pixels on the shorter side."""
+        height, width = self._levels[0].shape[:2]
+        depth = 1
+        while min(width, height) > self.min_size:
+            width, height = (width + 1) // 2, (height + 1) // 2
+            depth += 1
+        return depth
+
+    def level_size(self, index):
+        """(width, height) of a level, without building it."""
+        height, width = self._levels[0].shape[:2]
+        for _ in range(index):
+            width, height = (width + 1) // 2, (height + 1) // 2
+        return width, height
+
+    def level(self, index):
+        """Level index (0 = full resolution) as an ImageData."""
+        return ImageData(self._to_uint8(self._level_array(index)), self.mode)
+
+    def for_scale(self, scale, method='bilinear'):
+        """
+        The image at any scale in (0, 1], served from the nearest level that is
+        not smaller than the requested size.
+
+        Returns:
+            (pixels, new_width, new_height), like shrink_image.
+        """
+        if not 0 < scale <= 1:
+            logger.error("Error: Pyramid scale must be in (0, 1].")
+            sys.exit()
+        width, height = self.level_size(0)
+        target = max(1, round(width * scale)), max(1, round(height * scale))
+        return self.for_size(target, method), target[0], target[1]
+
+    def for_size(self, new_size, method='bilinear'):
+        """The image at new_size = (width, height), resampled from the nearest larger level."""
+        index = 0
+        while index + 1 < self.depth:
+            width, height = self.level_size(index + 1)
+            if width < new_size[0] or height < new_size[1]:
+                break
+            index += 1
+
+        level = self._level_array(index)
+        if self.level_size(index) == tuple(new_size):
+            return ImageData(self._to_uint8(level), self.mode)
+        # Less than a factor of 2 left, so a short filter is enough
+        return resample(self._to_uint8(level), self.level_size(index), new_size, method, self.mode)
+
+    def coarse_to_fine(self):
+        """Yield (index, ImageData) from the coarsest level up to full resolution."""
+        for index in reversed(range(self.depth)):
+            yield index, self.level(index)
+
+    def _level_array(self, index):
+        if not 0 <= index < self.depth:
+            logger.error(f"Error: Pyramid level {index} does not exist (depth {self.depth}).")
+            sys.exit()
+        reduce = REDUCE_METHODS[self.method]
+        while len(self._levels) <= index:
+            self._levels.append(reduce(self._levels[-1]))
+        return self._levels[index]
+
+    @staticmethod
+    def _to_uint8(array):
+        if array.dtype == np.uint8:
+            return array
+        return np.clip(np.rint(array), 0, 255).astype(np.uint8)
+
+
+def get_pyramid(pixels, mode, size, method='box'):
+    """
+    Pyramid of an image, shared between callers: asking again for the same
+    pixels (by content) and method returns the already built levels.
+    """
+    key = (image_digest(pixels), method)
+    if key in _pyramids:
+        _pyramids.move_to_end(key)
+        return _pyramids[key]
+
+    pyramid = ImagePyramid(pixels, mode, size, method)
+    _pyramids[key] = pyramid
+    while len(_pyramids) > MAX_CACHED_PYRAMIDS:
+        _pyramids.popitem(last=False)
+    return pyramid
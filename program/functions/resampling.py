@@ -0,0 +1,147 @@
+import functools
+import sys
+
+import numpy as np
+
+from utils.image_data import ImageData, as_array
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def box_kernel(x):
+    """
+    Area average: every source pixel under the output pixel counts equally.
+    The interval is (-0.5, 0.5], as in PIL, so an output pixel centred exactly
+    on a pixel boundary takes the pixel before it and never gets zero taps.
+    """
+    return ((x > -0.5) & (x <= 0.5)).astype(np.float64)
+
+
+def bilinear_kernel(x):
+    """Triangle (tent) kernel."""
+    return np.maximum(1.0 - np.abs(x), 0.0)
+
+
+def bicubic_kernel(x, a=-0.5):
+    """Keys cubic convolution kernel (a = -0.5, as in PIL)."""
+    x = np.abs(x)
+    return np.where(x < 1.0, ((a + 2.0) * x - (a + 3.0)) * x * x + 1.0,
+                    np.where(x < 2.0, (((x - 5.0) * x + 8.0) * x - 4.0) * a, 0.0))
+
+
+def lanczos_kernel(x, lobes=3):
+    """Windowed sinc with 3 lobes."""
+    return np.where(np.abs(x) < lobes, np.sinc(x) * np.sinc(x / lobes), 0.0)
+
+
+# method name -> (kernel, support radius in source pixels at scale 1)
+RESAMPLING_FILTERS = {
+    'box': (box_kernel, 0.5),
+    'bilinear': (bilinear_kernel, 1.0),
+    'bicubic': (bicubic_kernel, 2.0),
+    'lanczos': (lanczos_kernel, 3.0),
+}
+
+
+@functools.lru_cache(maxsize=64)
+def weight_table(in_size, out_size, method):
+    """
+    Precompute the source indices and normalized weights of every output row (or column).
+
+    Args:
+        in_size: Number of source pixels along the axis.
+        out_size: Number of output pixels along the axis.
+        method: One of RESAMPLING_FILTERS.
+
+    Returns:
+        indices, weights: two (out_size, taps) arrays. Output pixel i is
+        sum(weights[i, t] * source[indices[i, t]] for t in range(taps)).
+    """
+    kernel, support = RESAMPLING_FILTERS[method]
+    scale = in_size / out_size
+    # When downscaling, stretch the kernel over the source pixels it covers (antialiasing)
+    filter_scale = max(scale, 1.0)
+    support *= filter_scale
+
+    centers = (np.arange(out_size) + 0.5) * scale
+    first = np.maximum((centers - support + 0.5).astype(np.int64), 0)
+    last = np.minimum((centers + support + 0.5).astype(np.int64), in_size)
+    taps = int(np.ceil(support)) * 2 + 1
+
+    indices = first[:, None] + np.arange(taps)
+    weights = kernel((indices - centers[:, None] + 0.5) / filter_scale)
+    weights[indices >= last[:, None]] = 0.0  # Taps past the window (or the image border) do not count
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    indices = np.minimum(indices, in_size - 1)
+    return indices, weights.astype(np.float32)
+
+
+def resample_axis(array, out_size, axis, method):
+    """Resample a float32 array along one axis with the precomputed weight table."""
+    indices, weights = weight_table(array.shape[axis], out_size, method)
+    # One vectorized gather + multiply-add per tap; weights broadcast over the other axes
+    weight_shape = [1] * array.ndim
+    weight_shape[axis] = out_size
+    out_shape = array.shape[:axis] + (out_size,) + array.shape[axis + 1:]
+    result = np.zeros(out_shape, dtype=np.float32)
+    product = np.empty(out_shape, dtype=np.float32)  # Reused, so each tap allocates only its gather
+    for tap in range(indices.shape[1]):
+        np.multiply(np.take(array, indices[:, tap], axis=axis), weights[:, tap].reshape(weight_shape), out=product)
+        result += product
+    return result
+
+
+def resample(pixels, size, new_size, method='bilinear', mode=None):
+    """
+    Resize an image to new_size with a separable filter.
+
+    Args:
+        pixels: ImageData, array or flat list of pixels.
+        size: (width, height) of the input.
+        new_size: (width, height) of the output; any positive integers.
+        method: 'box' (area average), 'bilinear', 'bicubic' or 'lanczos'.
+        mode: Image mode for the result (taken from pixels if it is an ImageData).
+
+    Returns:
+        ImageData with the resized uint8 pixels.
+    """
+    if method not in RESAMPLING_FILTERS:
+        logger.error(f"Error: Unknown resampling method '{method}'. Use one of: {', '.join(RESAMPLING_FILTERS)}.")
+        sys.exit()
+    new_width, new_height = int(new_size[0]), int(new_size[1])
+    if new_width <= 0 or new_height <= 0:
+        logger.error("Error: The target size must be positive.")
+        sys.exit()
+
+    mode = pixels.mode if isinstance(pixels, ImageData) else mode
+    image = as_array(pixels, mode, size).astype(np.float32)
+    height, width = image.shape[:2]
+
+    # Rows first: gathering whole rows is much faster than gathering interleaved columns.
+    # Only go column-first when that pass shrinks and the row pass would enlarge the data.
+    passes = [(new_height, 0), (new_width, 1)]
+    if new_width < width and new_height > height:
+        passes.reverse()
+    for out_size, axis in passes:
+        if out_size != image.shape[axis]:
+            image = resample_axis(image, out_size, axis, method)
+
+    return ImageData(np.clip(np.rint(image), 0, 255).astype(np.uint8), mode)
+
+
+def scale_image(pixels, width, height, factor, method='bilinear'):
+    """
+    Scale the image by any positive factor (e.g. 0.25 or 1.5).
+
+    Returns:
+        (pixels, new_width, new_height), like shrink_image and enlarge_image.
+    """
+    if factor <= 0:
+        logger.error("Error: Scale factor must be greater than 0.")
+        sys.exit()
+    logger.info(f"Scaling image by a factor of {factor} ({method})")
+    new_width = max(1, round(width * factor))
+    new_height = max(1, round(height * factor))
+    return resample(pixels, (width, height), (new_width, new_height), method), new_width, new_height
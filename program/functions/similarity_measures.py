@@ -1,83 +1,335 @@
-def mean_square_error(original_pixels, compared_pixels, width, height):
-    """Calculate Mean Square Error (MSE) between the original image and another image."""
-    sum_squared_error = 0.0  # Initialize sum of squared differences
+import sys
 
-    # Loop through each pixel by coordinates
-    for y in range(height):
-        for x in range(width):
-            # Calculate the index for a 1D array representation
-            idx = y * width + x
+import numpy as np
 
-            # Access the pixels directly
-            orig_pixel = original_pixels[idx]
-            comp_pixel = compared_pixels[idx]
+from functions.pyramid import reduce_box
+from utils.file_operations import load_image
+from utils.image_data import ImageData, as_array
+from utils.log import get_logger
 
-            # Calculate squared difference for each channel (RGB)
-            if isinstance(orig_pixel, tuple):  # Color image
-                difference = sum((o - c) ** 2 for o, c in zip(orig_pixel, comp_pixel))
-            else:  # Grayscale image
-                difference = (orig_pixel - comp_pixel) ** 2
+logger = get_logger(__name__)
 
-            # Add the squared difference to the total sum
-            sum_squared_error += difference
+PEAK_VALUE = 255.0  # Assuming 8-bit image depth (values from 0 to 255)
+METRIC_NAMES = ('mse', 'pmse', 'snr', 'psnr', 'md')
+STRUCTURAL_METRIC_NAMES = ('ssim', 'ms_ssim')
+STREAM_CHUNK_PIXELS = 1 << 20  # Pixels compared per chunk, so memory stays bounded for any image size
 
-    # Calculate MSE
-    mse = sum_squared_error / (width * height)  # Divide by total number of pixels
+# SSIM constants of Wang et al. (2004): C1 = (K1 * L)^2, C2 = (K2 * L)^2
+SSIM_K1, SSIM_K2 = 0.01, 0.03
+SSIM_WINDOW_SIZE = 11
+SSIM_GAUSSIAN_SIGMA = 1.5
+# Weights of the five scales of MS-SSIM (Wang, Simoncelli & Bovik, 2003), finest first
+MS_SSIM_WEIGHTS = (0.0448, 0.2856, 0.3001, 0.2363, 0.1333)
 
-    return mse
 
+class ImageMetrics:
+    """
+    All similarity measures of one image pair, from a single pass over the differences.
 
-def peak_mean_square_error(original_pixels, filtered_pixels, width, height):
-    """Calculate Peak Mean Square Error (PMSE) between original and filtered image."""
-    # Calculate MSE using the mean_square_error function
-    mse_value = mean_square_error(original_pixels, filtered_pixels, width, height)
+    mse, pmse, snr, psnr and md hold the whole-image values, with the same
+    definitions as the functions below (MSE sums the squared errors of all
+    channels per pixel). channels holds one dict per channel with the same
+    keys, each computed as if that channel were a grayscale image.
+    """
 
-    # Calculate PMSE
-    peak_value = 255.0  # Assuming 8-bit image depth (values from 0 to 255)
-    pmse = (peak_value ** 2) / mse_value if mse_value != 0 else float('inf')  # Avoid division by zero
+    def __init__(self, squared_errors, signal_energy, max_differences, pixel_count):
+        # Per-channel sums as Python ints, so the divisions below match the former pixel loops exactly
+        squared_errors = [int(value) for value in squared_errors]
+        signal_energy = [int(value) for value in signal_energy]
+        max_differences = [int(value) for value in max_differences]
 
-    return pmse
+        self.pixel_count = pixel_count
+        self.channels = [
+            self._metrics(error, energy / pixel_count, difference, pixel_count)
+            for error, energy, difference in zip(squared_errors, signal_energy, max_differences)
+        ]
+        signal_power = sum(signal_energy) / (pixel_count * len(signal_energy))  # Average over all channels
+        overall = self._metrics(sum(squared_errors), signal_power, max(max_differences), pixel_count)
+        for name in METRIC_NAMES:
+            setattr(self, name, overall[name])
 
+    @staticmethod
+    def _metrics(squared_error, signal_power, max_difference, pixel_count):
+        mse = squared_error / pixel_count
+        return {
+            'mse': mse,
+            'pmse': PEAK_VALUE ** 2 / mse if mse != 0 else float('inf'),
+            'snr': 10 * (signal_power / mse) ** 0.5 if mse != 0 else float('inf'),
+            'psnr': 10 * (255 ** 2 / mse) if mse != 0 else float('inf'),
+            'md': max_difference,
+        }
 
+    def as_dict(self):
+        """Whole-image values by name, plus the per-channel list under 'channels'."""
+        result = {name: getattr(self, name) for name in METRIC_NAMES}
+        result['channels'] = self.channels
+        return result
+
+
+def _sample_rows(pixels, width=None, height=None):
+    """
+    The pixels as an array of shape (rows, pixels per row, channels),
+    without copying (memory-mapped images stay on disk until a chunk is read).
+    """
+    if isinstance(pixels, ImageData):
+        array = pixels.array
+        height, width = array.shape[:2]
+    else:
+        array = np.asarray(pixels)
+    if array.ndim == 3:
+        return array
+    if array.ndim == 2:
+        if array.shape == (height, width):
+            return array[:, :, None]  # Grayscale image
+        return array[:, None, :]  # Flat list of colour tuples
+    return array[:, None, None]  # Flat list of grayscale values
+
+
+def _channels_first(rows):
+    """A (rows, pixels per row, channels) chunk as a contiguous int32 array of shape (channels, pixels)."""
+    chunk = np.array(np.moveaxis(rows, -1, 0), dtype=np.int32, order='C')
+    return chunk.reshape(chunk.shape[0], -1)
+
+
+def compare_images(original_pixels, compared_pixels, width=None, height=None, chunk_rows=None):
+    """
+    Compute every similarity measure between two images in one vectorized pass.
+
+    The images are walked in chunks of rows (about STREAM_CHUNK_PIXELS pixels
+    each), and the squared errors, signal energy and maximum difference are
+    accumulated exactly in int64. Only one chunk of each image is in memory
+    at a time, so memory-mapped scans of any size can be compared.
+
+    Args:
+        original_pixels: Reference image (ImageData, array or flat pixel list).
+        compared_pixels: Image compared to it, same size and mode.
+        width, height: Image size (only needed for 2D grayscale arrays).
+        chunk_rows: Rows per chunk (default: from STREAM_CHUNK_PIXELS).
+
+    Returns:
+        ImageMetrics with the whole-image and per-channel values.
+    """
+    return compare_many(original_pixels, [compared_pixels], width, height, chunk_rows)[0]
+
+
+def compare_many(original_pixels, candidates, width=None, height=None, chunk_rows=None):
+    """
+    Compare one reference image with many candidates (e.g. the results of a
+    denoiser parameter sweep) in a single pass over the reference.
+
+    Each chunk of rows of all candidates is stacked into one
+    (candidates, channels, pixels) array, so the differences and every
+    measure of the whole candidate matrix come from one broadcast
+    subtraction and a few reductions. Chunks shrink with the number of
+    candidates, so memory stays at about STREAM_CHUNK_PIXELS pixels per chunk.
+
+    Args:
+        original_pixels: Reference image (ImageData, array or flat pixel list).
+        candidates: List of images of the same size and mode.
+        width, height: Image size (only needed for 2D grayscale arrays).
+        chunk_rows: Rows per chunk (default: from STREAM_CHUNK_PIXELS).
+
+    Returns:
+        List of ImageMetrics, one per candidate, in order.
+    """
+    original = _sample_rows(original_pixels, width, height)
+    candidates = [_sample_rows(candidate, width, height) for candidate in candidates]
+    if any(candidate.shape != original.shape for candidate in candidates):
+        logger.error("Error: The compared images must have the same size and mode.")
+        sys.exit()
+
+    rows, row_length, channels = original.shape
+    count = len(candidates)
+    chunk_rows = chunk_rows or max(STREAM_CHUNK_PIXELS // max(row_length * count, 1), 1)
+    squared_errors = np.zeros((count, channels), dtype=np.int64)
+    signal_energy = np.zeros(channels, dtype=np.int64)
+    max_differences = np.zeros((count, channels), dtype=np.int64)
+    for start in range(0, rows, chunk_rows):
+        # Channels first: reductions along contiguous rows are several times faster than down a 3-wide axis
+        original_chunk = _channels_first(original[start:start + chunk_rows])
+        stacked = np.stack([_channels_first(candidate[start:start + chunk_rows]) for candidate in candidates])
+        difference = np.subtract(original_chunk, stacked, out=stacked)  # Broadcast over the candidates
+        squared_errors += np.einsum('ncp,ncp->nc', difference, difference, dtype=np.int64)
+        signal_energy += np.einsum('cp,cp->c', original_chunk, original_chunk, dtype=np.int64)
+        chunk_max = np.maximum(difference.max(axis=2, initial=0), -difference.min(axis=2, initial=0))
+        np.maximum(max_differences, chunk_max, out=max_differences)
+
+    return [ImageMetrics(squared_errors[index], signal_energy, max_differences[index], rows * row_length)
+            for index in range(count)]
+
+
+def compare_image_files(original_path, compared_path, chunk_rows=None):
+    """
+    Compare two image files chunk by chunk. Uncompressed BMPs are memory-mapped,
+    so gigapixel scans never have to be resident; other formats are decoded first.
+
+    Returns:
+        ImageMetrics, as compare_images.
+    """
+    original_pixels, _, size, _ = load_image(original_path, use_memmap=True)
+    compared_pixels, _, compared_size, _ = load_image(compared_path, use_memmap=True)
+    if size != compared_size:
+        logger.error(f"Error: '{compared_path}' is {compared_size[0]}x{compared_size[1]}, "
+                     f"but '{original_path}' is {size[0]}x{size[1]}.")
+        sys.exit()
+    return compare_images(original_pixels, compared_pixels, size[0], size[1], chunk_rows)
 
-def signal_to_noise_ratio(original, modified, width, height):
-    """Calculates the Signal to Noise Ratio."""
-    mse = mean_square_error(original, modified, width, height)
 
-    # Calculate signal power
-    signal_power = sum(sum(o_channel ** 2 for o_channel in o) for o in original) / (len(original) * 3)  # Average for R, G, B
+def mean_square_error(original_pixels, compared_pixels, width, height):
+    """Calculate Mean Square Error (MSE) between the original image and another image."""
+    return compare_images(original_pixels, compared_pixels, width, height).mse
 
-    if mse == 0:
-        return float('inf')  # SNR is infinite if there is no error
-    snr = 10 * (signal_power / mse) ** 0.5
-    return snr
+
+def peak_mean_square_error(original_pixels, filtered_pixels, width, height):
+    """Calculate Peak Mean Square Error (PMSE) between original and filtered image."""
+    return compare_images(original_pixels, filtered_pixels, width, height).pmse
+
+
+def signal_to_noise_ratio(original, modified, width, height):
+    """Calculates the Signal to Noise Ratio."""
+    return compare_images(original, modified, width, height).snr
 
 
 def peak_signal_to_noise_ratio(original, modified, width, height):
     """Calculates the Peak Signal to Noise Ratio."""
-    mse = mean_square_error(original, modified, width, height)
-    if mse == 0:
-        return float('inf')  # PSNR is infinite if there is no error
-    psnr = 10 * (255 ** 2 / mse)
-    return psnr
+    return compare_images(original, modified, width, height).psnr
 
 
 def maximum_difference(original_pixels, filtered_pixels):
     """Calculate Maximum Difference (MD) between original and filtered image."""
+    return compare_images(original_pixels, filtered_pixels).md
+
+
+def _float_planes(pixels, width, height):
+    """The image as a float64 array of shape (height, width, channels)."""
+    mode = pixels.mode if isinstance(pixels, ImageData) else None
+    image = np.asarray(as_array(pixels, mode, (width, height)), dtype=np.float64)
+    return image[:, :, None] if image.ndim == 2 else image
+
+
+def _window_means(stack, window, window_size):
+    """
+    Local means over every window_size x window_size window that fits inside
+    the image ('valid' windows, as in the reference SSIM implementation).
+
+    stack has shape (quantities, height, width, channels), so all local
+    statistics are filtered together. The box window reads window sums from
+    an integral image (exact, and the same cost for any window size); the
+    Gaussian window is applied as two separable 1D passes.
+    """
+    if window == 'box':
+        integral = np.zeros((stack.shape[0], stack.shape[1] + 1, stack.shape[2] + 1, stack.shape[3]))
+        np.cumsum(np.cumsum(stack, axis=1), axis=2, out=integral[:, 1:, 1:])
+        n = window_size
+        sums = integral[:, n:, n:] - integral[:, :-n, n:] - integral[:, n:, :-n] + integral[:, :-n, :-n]
+        return sums / (n * n)
+
+    taps = np.arange(window_size) - (window_size - 1) / 2
+    weights = np.exp(-taps ** 2 / (2 * SSIM_GAUSSIAN_SIGMA ** 2))
+    weights /= weights.sum()
+    for axis in (1, 2):
+        length = stack.shape[axis] - window_size + 1
+        window_slice = [slice(None)] * stack.ndim
+        window_slice[axis] = slice(0, length)
+        filtered = weights[0] * stack[tuple(window_slice)]
+        product = np.empty_like(filtered)  # Reused, so the taps allocate nothing
+        for tap in range(1, window_size):
+            window_slice[axis] = slice(tap, tap + length)
+            np.multiply(stack[tuple(window_slice)], weights[tap], out=product)
+            filtered += product
+        stack = filtered
+    return stack
+
+
+def _ssim_components(original, compared, window, window_size):
+    """Per-window luminance term and contrast-structure term of two float (H, W, C) images."""
+    height, width = original.shape[:2]
+    if min(height, width) < window_size:
+        logger.error(f"Error: SSIM needs images of at least {window_size}x{window_size} pixels.")
+        sys.exit()
+
+    c1 = (SSIM_K1 * PEAK_VALUE) ** 2
+    c2 = (SSIM_K2 * PEAK_VALUE) ** 2
+    valid_shape = (height - window_size + 1, width - window_size + 1, original.shape[2])
+    luminance = np.empty(valid_shape)
+    contrast_structure = np.empty(valid_shape)
+    # One channel at a time keeps the five filtered statistics small
+    for channel in range(original.shape[2]):
+        x = original[:, :, channel:channel + 1]
+        y = compared[:, :, channel:channel + 1]
+        mean_x, mean_y, mean_xx, mean_yy, mean_xy = _window_means(np.stack([x, y, x * x, y * y, x * y]),
+                                                                   window, window_size)
+        var_x = mean_xx - mean_x * mean_x
+        var_y = mean_yy - mean_y * mean_y
+        covariance = mean_xy - mean_x * mean_y
+        luminance[:, :, channel:channel + 1] = (2 * mean_x * mean_y + c1) / (mean_x * mean_x + mean_y * mean_y + c1)
+        contrast_structure[:, :, channel:channel + 1] = (2 * covariance + c2) / (var_x + var_y + c2)
+    return luminance, contrast_structure
+
+
+def structural_similarity(original_pixels, compared_pixels, width, height, window='gaussian',
+                          window_size=SSIM_WINDOW_SIZE, return_map=False):
+    """
+    Calculate the Structural Similarity Index (SSIM) between two images.
+
+    Args:
+        original_pixels, compared_pixels: ImageData, arrays or flat pixel lists.
+        width, height: Image size.
+        window: 'gaussian' (sigma 1.5, as in the SSIM paper) or 'box' (integral image).
+        window_size: Side of the square window.
+        return_map: Also return the SSIM of every window.
+
+    Returns:
+        The mean SSIM (1.0 for identical images). Colour images are scored
+        per channel and averaged. With return_map=True, (mean, map) where map
+        has shape (height - window_size + 1, width - window_size + 1) and holds
+        the SSIM of the window around each pixel that the window fits around.
+    """
+    if window not in ('gaussian', 'box'):
+        logger.error(f"Error: Unknown SSIM window '{window}'. Use gaussian or box.")
+        sys.exit()
+
+    original = _float_planes(original_pixels, width, height)
+    compared = _float_planes(compared_pixels, width, height)
+    luminance, contrast_structure = _ssim_components(original, compared, window, window_size)
+    ssim_map = (luminance * contrast_structure).mean(axis=2)  # Average of the channels
+
+    score = float(ssim_map.mean())
+    return (score, ssim_map) if return_map else score
+
 
-    max_diff = 0.0  # Initialize maximum difference
+def multiscale_structural_similarity(original_pixels, compared_pixels, width, height, window='gaussian',
+                                     window_size=SSIM_WINDOW_SIZE, weights=MS_SSIM_WEIGHTS):
+    """
+    Calculate the multi-scale SSIM (MS-SSIM) between two images.
 
-    # Loop directly over each pixel in the 1D array
-    for orig_pixel, comp_pixel in zip(original_pixels, filtered_pixels):
-        # Calculate absolute difference for each channel in color images
-        if isinstance(orig_pixel, tuple):  # Color image (e.g., RGB)
-            difference = max(abs(o - c) for o, c in zip(orig_pixel, comp_pixel))
-        else:  # Grayscale image
-            difference = abs(orig_pixel - comp_pixel)
+    The contrast-structure term is measured at len(weights) scales, halving
+    the images (2x2 average) between scales; the luminance term only at the
+    coarsest one. Each term is raised to the weight of its scale. With the
+    default weights the images must be at least 16 * window_size pixels on the shorter side.
 
-        # Update the maximum difference
-        if difference > max_diff:
-            max_diff = difference
+    Returns:
+        The MS-SSIM score (1.0 for identical images).
+    """
+    if window not in ('gaussian', 'box'):
+        logger.error(f"Error: Unknown SSIM window '{window}'. Use gaussian or box.")
+        sys.exit()
 
-    return max_diff
+    original = _float_planes(original_pixels, width, height)
+    compared = _float_planes(compared_pixels, width, height)
+    if min(width, height) >> (len(weights) - 1) < window_size:
+        logger.error(f"Error: MS-SSIM with {len(weights)} scales needs images of at least "
+                     f"{window_size << (len(weights) - 1)} pixels on the shorter side.")
+        sys.exit()
 
+    score = 1.0
+    for scale, weight in enumerate(weights):
+        luminance, contrast_structure = _ssim_components(original, compared, window, window_size)
+        if scale == len(weights) - 1:
+            value = (luminance * contrast_structure).mean()
+        else:
+            value = contrast_structure.mean()
+            original, compared = reduce_box(original), reduce_box(compared)
+        # Negative similarities (anti-correlated images) count as no similarity
+        score *= max(float(value), 0.0) ** weight
+    return score
@@ -1,14 +1,21 @@
 import sys
 from statistics import variance
 
-from functions.elementary import adjust_brightness, adjust_contrast, apply_negative
-from functions.geometric import horizontal_flip, vertical_flip, diagonal_flip, shrink_image, enlarge_image
-from functions.noise_removal import alpha_trimmed_mean_filter, geometric_mean_filter
-from functions.similarity_measures import mean_square_error, peak_mean_square_error, signal_to_noise_ratio, peak_signal_to_noise_ratio, maximum_difference
+import numpy as np
+
+from functions.pipeline import ImagePipeline
+from functions.pyramid import get_pyramid
+from functions.noise_removal import alpha_trimmed_mean_filter, geometric_mean_filter, median_filter, adaptive_median_filter, vector_median_filter
+from functions.similarity_measures import (compare_images, structural_similarity, multiscale_structural_similarity,
+                                          METRIC_NAMES, STRUCTURAL_METRIC_NAMES)
 from functions.improvement import power_2_3_pdf
+from functions.denoise_tuning import tune_denoiser
 from utils.file_operations import load_image, save_image
 from utils.help import print_help
 from utils.parse_arguments import parse_arguments
+from utils.tiling import process_tiled
+from utils.parallel import process_parallel
+from utils.cache import ResultCache, DEFAULT_CACHE_DIR
 
 # ==============================
 # TASK 1 SCRIPT
@@ -29,57 +36,146 @@ input_image_path = sys.argv[1]
 output_image_path = sys.argv[2]  # Output path for saving images
 commands = sys.argv[3:]
 
+# Dictionary to store command-line argument values (e.g., brightness, contrast).
+# Parsed before loading so --profile also covers the image loading.
+args_dict = parse_arguments(commands, globals())
+
+# Map BMPs straight from disk instead of decoding them (for very large scans)
+use_memmap = 'mmap' in args_dict
+
 # Load the original image without noise
-original_pixels, mode, size, im = load_image(input_image_path)  # Load original pixels
+original_pixels, mode, size, im = load_image(input_image_path, use_memmap)  # Load original pixels
 
 # Load the noisy image (you can provide the path as an argument)
-noisy_pixels, _, size_noisy, _ = load_image(output_image_path)  # Load noisy pixels (second image)
+noisy_pixels, _, size_noisy, _ = load_image(output_image_path, use_memmap)  # Load noisy pixels (second image)
 
 # Initialize pixels for processing
 pixels = original_pixels.copy()  # Create a copy for processing
 
-# Dictionary to store command-line argument values (e.g., brightness, contrast)
-args_dict = parse_arguments(commands)
+# Filter results are cached by pixel content and parameters, so the metric
+# commands below filter the noisy image once and repeated runs reuse it
+if 'no_cache' in args_dict:
+    alpha_filter, gmean_filter = alpha_trimmed_mean_filter, geometric_mean_filter
+    median, amedian, vmedian = median_filter, adaptive_median_filter, vector_median_filter
+else:
+    result_cache = ResultCache(args_dict.get('cache_dir', DEFAULT_CACHE_DIR))
+    alpha_filter = result_cache.wrap(alpha_trimmed_mean_filter)
+    gmean_filter = result_cache.wrap(geometric_mean_filter)
+    median, amedian = result_cache.wrap(median_filter), result_cache.wrap(adaptive_median_filter)
+    vmedian = result_cache.wrap(vector_median_filter)
+
+# Elementary and geometric operations are recorded in a lazy pipeline and fused
+# when materialized. Every step saves its own output unless --no_intermediate
+# is given, in which case only the result of the last step is written.
+pipeline = ImagePipeline(pixels, mode, size)
+save_steps = 'no_intermediate' not in args_dict
+last_output_path = None
+
+def save_point(output_path):
+    """Save the current pipeline result, or defer it when intermediate saves are off."""
+    global last_output_path
+    last_output_path = output_path
+    if save_steps:
+        pipeline.save(output_path)
 
 # Apply elementary operations if specified
 if 'brightness' in args_dict:
     brightness_factor = int(args_dict['brightness'])
-    pixels = adjust_brightness(pixels, brightness_factor)
-    save_image(pixels, mode, size, 'output_brightness.bmp')  # Save after brightness adjustment
+    pipeline.brightness(brightness_factor)
+    save_point('output_brightness.bmp')  # Save after brightness adjustment
 
 if 'contrast' in args_dict:
     contrast_factor = float(args_dict['contrast'])
-    pixels = adjust_contrast(pixels, contrast_factor)
-    save_image(pixels, mode, size, 'output_contrast.bmp')  # Save after contrast adjustment
+    pipeline.contrast(contrast_factor)
+    save_point('output_contrast.bmp')  # Save after contrast adjustment
 
 if 'negative' in args_dict:
-    pixels = apply_negative(pixels)
-    save_image(pixels, mode, size, 'output_negative.bmp')  # Save after negative application
+    pipeline.negative()
+    save_point('output_negative.bmp')  # Save after negative application
 
 # Apply geometric operations if specified
 if 'hflip' in args_dict:
-    pixels = horizontal_flip(pixels, size[0], size[1])
-    save_image(pixels, mode, size, 'output_hflip.bmp')  # Save after horizontal flip
+    pipeline.hflip()
+    save_point('output_hflip.bmp')  # Save after horizontal flip
 
 if 'vflip' in args_dict:
-    pixels = vertical_flip(pixels, size[0], size[1])
-    save_image(pixels, mode, size, 'output_vflip.bmp')  # Save after vertical flip
+    pipeline.vflip()
+    save_point('output_vflip.bmp')  # Save after vertical flip
 
 if 'dflip' in args_dict:
-    pixels = diagonal_flip(pixels, size[0], size[1])
-    save_image(pixels, mode, size, 'output_dflip.bmp')  # Save after diagonal flip
+    pipeline.dflip()
+    save_point('output_dflip.bmp')  # Save after diagonal flip
+
+if 'adflip' in args_dict:
+    pipeline.adflip()
+    save_point('output_adflip.bmp')  # Save after anti-diagonal flip
+
+if 'rotate' in args_dict:
+    # Any angle; multiples of 90 are exact, others use --interpolation (bilinear by default)
+    rotation_angle = float(args_dict['rotate'])
+    pipeline.rotate(rotation_angle, args_dict.get('interpolation', 'bilinear'), 'expand' in args_dict)
+    save_point('output_rotate.bmp')  # Save after rotation
+
+# With --resample=box|bilinear|bicubic|lanczos, shrink and enlarge filter the image
+# instead of picking / repeating pixels, and accept non-integer factors
+resample_method = args_dict.get('resample')
 
 if 'shrink' in args_dict:
-    shrink_factor = int(args_dict['shrink'])
-    pixels, new_width, new_height = shrink_image(pixels, size[0], size[1], shrink_factor)
-    size = (new_width, new_height)
-    save_image(pixels, mode, size, 'output_shrink.bmp')  # Save after shrinking
+    if resample_method:
+        pipeline.scale(1 / float(args_dict['shrink']), resample_method)
+    else:
+        shrink_factor = int(args_dict['shrink'])
+        pipeline.shrink(shrink_factor)
+    save_point('output_shrink.bmp')  # Save after shrinking
 
 if 'enlarge' in args_dict:
-    enlarge_factor = int(args_dict['enlarge'])
-    pixels, new_width, new_height = enlarge_image(pixels, size[0], size[1], enlarge_factor)
-    size = (new_width, new_height)
-    save_image(pixels, mode, size, 'output_enlarge.bmp')  # Save after enlarging
+    if resample_method:
+        pipeline.scale(float(args_dict['enlarge']), resample_method)
+    else:
+        enlarge_factor = int(args_dict['enlarge'])
+        pipeline.enlarge(enlarge_factor)
+    save_point('output_enlarge.bmp')  # Save after enlarging
+
+if 'resize' in args_dict:
+    target_width, target_height = map(int, args_dict['resize'].lower().split('x'))
+    pipeline.resize((target_width, target_height), resample_method or 'bilinear')
+    save_point('output_resize.bmp')  # Save after resizing
+
+if last_output_path is not None and not save_steps:
+    pipeline.save(last_output_path)  # Single materialization of the whole chain
+
+pixels = pipeline.materialize()
+size = pipeline.size
+
+# Previews / thumbnails at several scales, all served from one cached image pyramid
+if 'thumbnails' in args_dict:
+    pyramid = get_pyramid(pixels, mode, size, args_dict.get('pyramid', 'box'))
+    for scale in args_dict['thumbnails'].split(','):
+        thumbnail, thumbnail_width, thumbnail_height = pyramid.for_scale(float(scale))
+        save_image(thumbnail, mode, (thumbnail_width, thumbnail_height),
+                   f'output_thumbnail_{thumbnail_width}x{thumbnail_height}.bmp')
+
+
+# Noise removal filters: each one runs on the current pixels and saves its own output
+def run_filter(operator, cached_operator, params, halo, output_name):
+    """
+    Apply a noise removal filter to the current pixels and save the result: in
+    parallel row bands with --processes, strip by strip with --tile_rows,
+    otherwise on the whole image through the result cache.
+    """
+    if 'processes' in args_dict:
+        result = process_parallel(pixels, mode, size, operator, params, halo, workers=int(args_dict['processes']))
+    elif 'tile_rows' in args_dict:
+        result = process_tiled(
+            pixels, mode, size,
+            lambda tile, tile_size: operator(tile, tile_size[0], tile_size[1], *params),
+            halo=halo, tile_rows=int(args_dict['tile_rows'])
+        )
+    else:
+        result = cached_operator(pixels, size[0], size[1], *params)
+    save_image(result, mode, size, output_name)
+    return result
+
 
 # Apply alpha-trimmed mean filter if specified
 if 'alpha' in args_dict:
@@ -95,11 +191,8 @@ if 'alpha' in args_dict:
 
         print(f"Applying alpha-trimmed mean filter with alpha {alpha_value} and kernel size {kernel_size}")
 
-        # Apply the alpha-trimmed mean filter
-        pixels = alpha_trimmed_mean_filter(pixels, size[0], size[1], kernel_size, alpha_value)
-
-        # Save the output image
-        save_image(pixels, mode, size, 'output_alpha.bmp')
+        pixels = run_filter(alpha_trimmed_mean_filter, alpha_filter, (kernel_size, alpha_value), kernel_size // 2,
+                            'output_alpha.bmp')
 
     except ValueError as e:
         print(f"Error: {e}")
@@ -118,133 +211,157 @@ if 'gmean' in args_dict:
 
         print(f"Applying geometric mean filter with gmean value {gmean_value} and kernel size {kernel_size}")
 
-        # Apply the filter
-        pixels = geometric_mean_filter(pixels, size[0], size[1], kernel_size)
-
-        # Save the output image
-        save_image(pixels, mode, size, 'output_gmean.bmp')
+        pixels = run_filter(geometric_mean_filter, gmean_filter, (kernel_size,), kernel_size // 2, 'output_gmean.bmp')
     except ValueError as e:
         print(f"Error: {e}")
 
-# Perform MSE calculation if specified
-if 'mse' in args_dict:
-    alpha_value = int(args_dict.get('alpha', 0))  # Default alpha value
-    kernel_size = 3  # Adjust as needed
+# Apply median filter if specified
+if 'median' in args_dict:
+    try:
+        kernel_size = int(args_dict.get('kernel_size', 3))  # Use 'kernel_size' from args_dict or default to 3
 
-    # Calculate MSE between original and noisy image
-    mse_noisy = mean_square_error(original_pixels, noisy_pixels, size_noisy[0], size_noisy[1])
+        # Ensure kernel_size is odd (commonly required for filters)
+        if kernel_size % 2 == 0:
+            raise ValueError("Kernel size must be an odd integer.")
 
-    # Apply alpha-trimmed mean filter to the noisy image
-    denoised_pixels = alpha_trimmed_mean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size, alpha_value)
+        print(f"Applying median filter with kernel size {kernel_size}")
 
-    # Calculate MSE between original and denoised image
-    mse_denoised = mean_square_error(original_pixels, denoised_pixels, size_noisy[0], size_noisy[1])
+        pixels = run_filter(median_filter, median, (kernel_size,), kernel_size // 2, 'output_median.bmp')
+    except ValueError as e:
+        print(f"Error: {e}")
 
-    # Print the MSE results
-    print(f'Mean Square Error (MSE) between original and noisy image: {mse_noisy}')
-    print(f'Mean Square Error (MSE) between original and denoised image: {mse_denoised}')
-    print(f'The difference between noisy image and denoised image equals: {mse_noisy - mse_denoised}')
+# Apply adaptive median filter if specified (--amedian=max kernel size, default 7)
+if 'amedian' in args_dict:
+    try:
+        max_kernel_size = 7 if args_dict['amedian'] is True else int(args_dict['amedian'])
 
-# Perform PMSE calculation if specified
-if 'pmse' in args_dict:
-    alpha_value = int(args_dict.get('alpha', 0))  # Default alpha value
-    kernel_size = 3  # Adjust as needed
+        # The window grows 3x3, 5x5, ... so the largest one has to be odd as well
+        if max_kernel_size % 2 == 0 or max_kernel_size < 3:
+            raise ValueError("Maximum kernel size must be an odd integer of at least 3.")
 
-    # Apply alpha-trimmed mean filter to the noisy image
-    denoised_pixels = alpha_trimmed_mean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size, alpha_value)
-    pmse_value = peak_mean_square_error(original_pixels, denoised_pixels, size_noisy[0], size_noisy[1])
-    print(f'Peak Mean Square Error (PMSE) between original and denoised image: {pmse_value}')
+        print(f"Applying adaptive median filter with maximum kernel size {max_kernel_size}")
 
-# Perform SNR calculation if specified
-if 'snr' in args_dict:
-    alpha_value = int(args_dict.get('alpha', 0))  # Default alpha value
-    kernel_size = 3  # Adjust as needed
+        pixels = run_filter(adaptive_median_filter, amedian, (max_kernel_size,), max_kernel_size // 2,
+                            'output_amedian.bmp')
+    except ValueError as e:
+        print(f"Error: {e}")
 
-    # Apply alpha-trimmed mean filter to the noisy image
-    denoised_pixels = alpha_trimmed_mean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size, alpha_value)
+# Apply vector median filter if specified (whole colours instead of each channel on its own)
+if 'vmedian' in args_dict:
+    try:
+        kernel_size = int(args_dict.get('kernel_size', 3))  # Use 'kernel_size' from args_dict or default to 3
 
-    # Calculate SNR between original and denoised image
-    snr_value = signal_to_noise_ratio(original_pixels, denoised_pixels, size_noisy[0], size_noisy[1])
-    print(f'Signal to Noise Ratio (SNR) between original and denoised image: {snr_value}')
+        # Ensure kernel_size is odd (commonly required for filters)
+        if kernel_size % 2 == 0:
+            raise ValueError("Kernel size must be an odd integer.")
 
-if 'psnr' in args_dict:
-    alpha_value = int(args_dict.get('alpha', 0))  # Default alpha value
-    kernel_size = 3  # Adjust as needed
+        print(f"Applying vector median filter with kernel size {kernel_size}")
 
-    # Apply alpha-trimmed mean filter to the noisy image
-    denoised_pixels = alpha_trimmed_mean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size, alpha_value)
+        pixels = run_filter(vector_median_filter, vmedian, (kernel_size,), kernel_size // 2, 'output_vmedian.bmp')
+    except ValueError as e:
+        print(f"Error: {e}")
+
+# SSIM window: gaussian (as in the SSIM paper) or box (integral image)
+ssim_window = args_dict.get('ssim_window', 'gaussian')
 
-    # Calculate PSNR between original and denoised image
-    psnr_value = peak_signal_to_noise_ratio(original_pixels, denoised_pixels, size_noisy[0], size_noisy[1])
-    print(f'Peak Signal to Noise Ratio (PSNR) between original and denoised image: {psnr_value}')
 
-if 'md' in args_dict:
+def save_ssim_map(ssim_map, path):
+    """Save an SSIM map as a grayscale image (white = identical, black = SSIM of 0 or less)."""
+    map_pixels = np.clip(np.rint(ssim_map * 255), 0, 255).astype(np.uint8)
+    save_image(map_pixels, 'L', (map_pixels.shape[1], map_pixels.shape[0]), path)
 
+
+# Similarity measures: the filter runs once and every requested measure comes
+# from a single comparison of the original and the filtered image
+if any(metric in args_dict for metric in METRIC_NAMES + STRUCTURAL_METRIC_NAMES):
     alpha_value = int(args_dict.get('alpha', 0))  # Default alpha value
     kernel_size = 3  # Adjust as needed
 
     # Apply alpha-trimmed mean filter to the noisy image
-    denoised_pixels = alpha_trimmed_mean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size, alpha_value)
-
-    md_value = maximum_difference(original_pixels, denoised_pixels)
-    print(f'Maximum Difference (MD) between original and denoised image: {md_value}')
-
-
-if 'mse_gmean' in args_dict:
-    kernel_size = 3  # Set default kernel size, can be adjusted
-
-    # Calculate MSE between original and noisy image
-    mse_noisy = mean_square_error(original_pixels, noisy_pixels, size_noisy[0], size_noisy[1])
-
-    # Apply geometric mean filter to the noisy image
-    gmean_filtered_pixels = geometric_mean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size)
-
-    # Calculate MSE between original and geometric mean-filtered image
-    mse_denoised_gmean = mean_square_error(original_pixels, gmean_filtered_pixels, size_noisy[0], size_noisy[1])
-
-    # Print the MSE results
-    print(f'Mean Square Error (MSE) between original and noisy image: {mse_noisy}')
-    print(f'Mean Square Error (MSE) between original and geometric mean filtered image: {mse_denoised_gmean}')
-    print(f'Difference between noisy and geometric mean filtered image MSE: {mse_noisy - mse_denoised_gmean}')
-
-# Perform PMSE calculation with geometric mean filter if specified
-if 'pmse_gmean' in args_dict:
-    kernel_size = 3  # Set default kernel size, can be adjusted
-
-    # Apply geometric mean filter to the noisy image
-    gmean_filtered_pixels = geometric_mean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size)
-    pmse_value_gmean = peak_mean_square_error(original_pixels, gmean_filtered_pixels, size_noisy[0], size_noisy[1])
-    print(f'Peak Mean Square Error (PMSE) between original and geometric mean filtered image: {pmse_value_gmean}')
-
-# Perform SNR calculation with geometric mean filter if specified
-if 'snr_gmean' in args_dict:
-    kernel_size = 3  # Set default kernel size, can be adjusted
-
-    # Apply geometric mean filter to the noisy image
-    gmean_filtered_pixels = geometric_mean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size)
-
-    # Calculate SNR between original and geometric mean-filtered image
-    snr_value_gmean = signal_to_noise_ratio(original_pixels, gmean_filtered_pixels, size_noisy[0], size_noisy[1])
-    print(f'Signal to Noise Ratio (SNR) between original and geometric mean filtered image: {snr_value_gmean}')
-
-# Perform PSNR calculation with geometric mean filter if specified
-if 'psnr_gmean' in args_dict:
-    kernel_size = 3  # Set default kernel size, can be adjusted
-
-    # Apply geometric mean filter to the noisy image
-    gmean_filtered_pixels = geometric_mean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size)
-
-    # Calculate PSNR between original and geometric mean-filtered image
-    psnr_value_gmean = peak_signal_to_noise_ratio(original_pixels, gmean_filtered_pixels, size_noisy[0], size_noisy[1])
-    print(f'Peak Signal to Noise Ratio (PSNR) between original and geometric mean filtered image: {psnr_value_gmean}')
-
-# Perform MD calculation with geometric mean filter if specified
-if 'md_gmean' in args_dict:
+    denoised_pixels = alpha_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size, alpha_value)
+    denoised = compare_images(original_pixels, denoised_pixels, size_noisy[0], size_noisy[1])
+
+    if 'mse' in args_dict:
+        # Calculate MSE between original and noisy image
+        mse_noisy = compare_images(original_pixels, noisy_pixels, size_noisy[0], size_noisy[1]).mse
+        print(f'Mean Square Error (MSE) between original and noisy image: {mse_noisy}')
+        print(f'Mean Square Error (MSE) between original and denoised image: {denoised.mse}')
+        print(f'The difference between noisy image and denoised image equals: {mse_noisy - denoised.mse}')
+    if 'pmse' in args_dict:
+        print(f'Peak Mean Square Error (PMSE) between original and denoised image: {denoised.pmse}')
+    if 'snr' in args_dict:
+        print(f'Signal to Noise Ratio (SNR) between original and denoised image: {denoised.snr}')
+    if 'psnr' in args_dict:
+        print(f'Peak Signal to Noise Ratio (PSNR) between original and denoised image: {denoised.psnr}')
+    if 'md' in args_dict:
+        print(f'Maximum Difference (MD) between original and denoised image: {denoised.md}')
+    if 'ssim' in args_dict:
+        ssim_value, ssim_map = structural_similarity(original_pixels, denoised_pixels, size_noisy[0], size_noisy[1],
+                                                     window=ssim_window, return_map=True)
+        print(f'Structural Similarity (SSIM) between original and denoised image: {ssim_value}')
+        if 'ssim_map' in args_dict:
+            save_ssim_map(ssim_map, 'output_ssim_map.bmp')
+    if 'ms_ssim' in args_dict:
+        ms_ssim_value = multiscale_structural_similarity(original_pixels, denoised_pixels, size_noisy[0], size_noisy[1],
+                                                         window=ssim_window)
+        print(f'Multi-scale Structural Similarity (MS-SSIM) between original and denoised image: {ms_ssim_value}')
+    if 'per_channel' in args_dict:
+        for channel, values in enumerate(denoised.channels):
+            print(f'Channel {channel}: ' + ', '.join(f'{name.upper()}={values[name]}' for name in METRIC_NAMES))
+
+# The same measures for the geometric mean filter (--mse_gmean, --pmse_gmean, ...)
+if any(f'{metric}_gmean' in args_dict for metric in METRIC_NAMES + STRUCTURAL_METRIC_NAMES):
     kernel_size = 3  # Set default kernel size, can be adjusted
 
     # Apply geometric mean filter to the noisy image
-    gmean_filtered_pixels = geometric_mean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size)
-
-    # Calculate Maximum Difference (MD) between original and geometric mean-filtered image
-    md_value_gmean = maximum_difference(original_pixels, gmean_filtered_pixels)
-    print(f'Maximum Difference (MD) between original and geometric mean filtered image: {md_value_gmean}')
\ No newline at end of file
+    gmean_filtered_pixels = gmean_filter(noisy_pixels, size_noisy[0], size_noisy[1], kernel_size)
+    gmean_filtered = compare_images(original_pixels, gmean_filtered_pixels, size_noisy[0], size_noisy[1])
+
+    if 'mse_gmean' in args_dict:
+        # Calculate MSE between original and noisy image
+        mse_noisy = compare_images(original_pixels, noisy_pixels, size_noisy[0], size_noisy[1]).mse
+        print(f'Mean Square Error (MSE) between original and noisy image: {mse_noisy}')
+        print(f'Mean Square Error (MSE) between original and geometric mean filtered image: {gmean_filtered.mse}')
+        print(f'Difference between noisy and geometric mean filtered image MSE: {mse_noisy - gmean_filtered.mse}')
+    if 'pmse_gmean' in args_dict:
+        print(f'Peak Mean Square Error (PMSE) between original and geometric mean filtered image: {gmean_filtered.pmse}')
+    if 'snr_gmean' in args_dict:
+        print(f'Signal to Noise Ratio (SNR) between original and geometric mean filtered image: {gmean_filtered.snr}')
+    if 'psnr_gmean' in args_dict:
+        print(f'Peak Signal to Noise Ratio (PSNR) between original and geometric mean filtered image: {gmean_filtered.psnr}')
+    if 'md_gmean' in args_dict:
+        print(f'Maximum Difference (MD) between original and geometric mean filtered image: {gmean_filtered.md}')
+    if 'ssim_gmean' in args_dict:
+        ssim_value, ssim_map = structural_similarity(original_pixels, gmean_filtered_pixels, size_noisy[0], size_noisy[1],
+                                                     window=ssim_window, return_map=True)
+        print(f'Structural Similarity (SSIM) between original and geometric mean filtered image: {ssim_value}')
+        if 'ssim_map' in args_dict:
+            save_ssim_map(ssim_map, 'output_ssim_map_gmean.bmp')
+    if 'ms_ssim_gmean' in args_dict:
+        ms_ssim_value = multiscale_structural_similarity(original_pixels, gmean_filtered_pixels, size_noisy[0], size_noisy[1],
+                                                         window=ssim_window)
+        print(f'Multi-scale Structural Similarity (MS-SSIM) between original and geometric mean filtered image: {ms_ssim_value}')
+    if 'per_channel' in args_dict:
+        for channel, values in enumerate(gmean_filtered.channels):
+            print(f'Channel {channel}: ' + ', '.join(f'{name.upper()}={values[name]}' for name in METRIC_NAMES))
+
+# Search the denoiser parameters that best restore the noisy image (second image)
+# against the original: --tune[=alpha,median,...] --tune_metric=mse|ssim --proxy=2
+if 'tune' in args_dict:
+    denoiser_names = args_dict['tune'].split(',') if isinstance(args_dict['tune'], str) else None
+    tune_metric = args_dict.get('tune_metric', 'mse')
+
+    print("Tuning denoiser parameters...")
+    confirmed, explored, tuned_pixels = tune_denoiser(
+        original_pixels, noisy_pixels, size_noisy[0], size_noisy[1], denoiser_names, tune_metric,
+        proxy_factor=int(args_dict.get('proxy', 2)), confirm=int(args_dict.get('confirm', 3)),
+        cache=None if 'no_cache' in args_dict else result_cache
+    )
+    print(f"Scored {len(explored)} candidates on the proxy, confirmed {len(confirmed)} at full resolution:")
+    for entry in confirmed:
+        params = ', '.join(f'{name}={value}' for name, value in entry['params'].items())
+        print(f"  {entry['denoiser']} ({params}): {tune_metric.upper()}={entry['score']} "
+              f"(proxy {entry['proxy_score']})")
+
+    # Save the winner, as filtered during the confirmation
+    save_image(tuned_pixels, mode, size_noisy, 'output_tuned.bmp')
@@ -2,7 +2,7 @@ import sys
 from PIL import Image
 import numpy as np
 
-from functions.histogram import save_histogram_image, calculate_histogram
+from functions.histogram import save_histogram_image, save_joint_histogram_image, calculate_histogram, roi_mask
 from functions.characteristics import (
     calculate_mean, calculate_mean_rgb, calculate_variance_rgb,
     calculate_asymmetry_coefficient, calculate_asymmetry_coefficient_rgb,
@@ -12,12 +12,13 @@ from functions.characteristics import (
 )
 from functions.characteristics import calculate_variance, calculate_standard_dev, calculate_variation_coefficient_1
 from functions.improvement import power_2_3_pdf
-from functions.linear_filtration import universal_convolution, optimized_convolution_detail_extraction, \
+from functions.linear_filtration import universal_convolution, \
     optimized_convolution
 from functions.non_linear_filtration import apply_roberts_operator
 from utils.file_operations import load_image, save_image
 from utils.help import print_help
 from utils.parse_arguments import parse_arguments
+from utils.tiling import process_tiled
 
 # ==============================
 # TASK 2 SCRIPT
@@ -47,10 +48,10 @@ if len(sys.argv) < 2 or '--help' in sys.argv:
 input_image_path = sys.argv[1]
 output_image_path = sys.argv[2]
 commands = sys.argv[3:]
+args_dict = parse_arguments(commands, globals())  # Parsed first so --profile covers loading
 
 original_pixels, mode, size, im = load_image(input_image_path)
 pixels = original_pixels.copy()
-args_dict = parse_arguments(commands)
 
 # Handle binary images
 if is_binary_image(im):
@@ -68,13 +69,41 @@ if mode == 'RGB' and is_grayscale(np.array(im)):
     pixels = original_pixels.copy()
 
 # ========== HISTOGRAM ========== #
+# --roi=x0,y0,x1,y1 restricts the histograms and statistics to a rectangle
+mask = None
+if 'roi' in args_dict:
+    try:
+        x0, y0, x1, y1 = map(int, str(args_dict['roi']).split(','))
+    except ValueError:
+        print("Error: --roi takes four integers: x0,y0,x1,y1.")
+        sys.exit(1)
+    mask = roi_mask(size, (x0, y0, x1, y1))
+
 if 'histogram' in args_dict:
     print("Calculating and saving histogram...")
     histogram_image_path = args_dict.get('histogram_output', 'histogram.png')
     channels = args_dict.get('channel', [])
     if isinstance(channels, str):
         channels = [channels]
-    save_histogram_image(pixels, mode, histogram_image_path, channels)
+    save_histogram_image(pixels, mode, histogram_image_path, channels, mask)
+
+# Joint histogram of two colour channels (--joint_histogram=red,blue; red,green by default)
+if 'joint_histogram' in args_dict:
+    channel_names = ['red', 'green', 'blue']
+    joint_channels = ['red', 'green']
+    if isinstance(args_dict['joint_histogram'], str):
+        joint_channels = args_dict['joint_histogram'].split(',')
+
+    if mode != 'RGB':
+        print("Error: --joint_histogram needs a colour image (grey images in RGB are read as grayscale).")
+        sys.exit(1)
+    if len(joint_channels) != 2 or len(set(joint_channels)) != 2 or not set(joint_channels) <= set(channel_names):
+        print(f"Error: --joint_histogram takes two different channels out of {', '.join(channel_names)}.")
+        sys.exit(1)
+
+    print(f"Calculating and saving joint {'-'.join(joint_channels)} histogram...")
+    save_joint_histogram_image(pixels, mode, args_dict.get('joint_histogram_output', 'joint_histogram.png'),
+                               tuple(channel_names.index(name) for name in joint_channels), mask)
 
 # ========== POWER TRANSFORMATION (hpower) ========== #
 if 'hpower' in args_dict:
@@ -112,13 +141,15 @@ if 'hpower' in args_dict:
     print("Improved image saved as 'output_hpower.bmp'")
 
 # ========== STATISTICAL CHARACTERISTICS ========== #
+# Every statistic comes from the same histogram, so it is counted only once
+if any(flag in args_dict for flag in ('cmean', 'cvariance', 'cstdev', 'cvarcoi', 'casyco', 'flaco', 'cvarcoii', 'centropy')):
+    histogram = calculate_histogram(pixels, mode, mask)
+
 if 'cmean' in args_dict:
-    histogram = calculate_histogram(pixels, mode)
     mean = calculate_mean_rgb(histogram) if mode == 'RGB' else calculate_mean(histogram)
     print(f"Mean value: {mean}")
 
 if 'cvariance' in args_dict:
-    histogram = calculate_histogram(pixels, mode)
     if mode == 'RGB':
         mean_rgb = calculate_mean_rgb(histogram)
         variance = calculate_variance_rgb(histogram, mean_rgb)
@@ -128,7 +159,6 @@ if 'cvariance' in args_dict:
     print(f"Variance value: {variance}")
 
 if "cstdev" in args_dict:
-    histogram = calculate_histogram(pixels, mode)
     if mode == 'RGB':
         mean_rgb = calculate_mean_rgb(histogram)  # Calculate mean for R, G, B
         variances = calculate_variance_rgb(histogram, mean_rgb)  # Get variances for R, G, B
@@ -150,7 +180,6 @@ if "cstdev" in args_dict:
     print(f"Standard deviation value: {st_dev}")
 
 if "cvarcoi" in args_dict:
-    histogram = calculate_histogram(pixels, mode)
     if mode == 'RGB':
         mean_rgb = calculate_mean_rgb(histogram)
         variances = calculate_variance_rgb(histogram, mean_rgb)
@@ -167,22 +196,18 @@ if "cvarcoi" in args_dict:
     print(f"Variation coefficient value: {var_co}")
 
 if "casyco" in args_dict:
-    histogram = calculate_histogram(pixels, mode)
     asym_coe = calculate_asymmetry_coefficient_rgb(histogram) if mode == 'RGB' else calculate_asymmetry_coefficient(histogram)
     print(f"Asymmetry Coefficient: {asym_coe}")
 
 if "flaco" in args_dict:
-    histogram = calculate_histogram(pixels, mode)
     flat_coe = calculate_flattening_coefficient_rgb(histogram) if mode == 'RGB' else calculate_flattening_coefficient(histogram)
     print(f"Flattening coefficient: {flat_coe}")
 
 if "cvarcoii" in args_dict:
-    histogram = calculate_histogram(pixels, mode)
     var_coeffs = calculate_variation_coefficient_2_rgb(histogram) if mode == 'RGB' else calculate_variation_coefficient_2(histogram)
     print(f"Variation coefficient II: {var_coeffs}")
 
 if "centropy" in args_dict:
-    histogram = calculate_histogram(pixels, mode)
     entropy_values = calculate_entropy_rgb(histogram) if mode == 'RGB' else calculate_entropy(histogram)
     print(f"Entropy value: {entropy_values}")
 
@@ -190,7 +215,14 @@ if "centropy" in args_dict:
 if 'sexdeti_universal' in args_dict:
     print("Performing detail extraction using universal convolution for a custom or predefined mask...")
     try:
-        output_pixels = universal_convolution(pixels, size, args_dict)
+        if 'tile_rows' in args_dict:
+            output_pixels = process_tiled(
+                pixels, mode, size,
+                lambda tile, tile_size: universal_convolution(tile, tile_size, args_dict),
+                halo=1, tile_rows=int(args_dict['tile_rows'])
+            )
+        else:
+            output_pixels = universal_convolution(pixels, size, args_dict)
         save_image(output_pixels, mode, size, output_image_path)
         filter_type = args_dict.get('filter', 'custom')
         print(f"Detail extraction with universal convolution completed and saved with {filter_type} mask.")
@@ -206,6 +238,10 @@ if 'sexdeti' in args_dict:
 
 if 'orobertsii' in args_dict:
     print("Applying Roberts II operator for edge detection...")
-    pixels = apply_roberts_operator(pixels, size)
+    if 'tile_rows' in args_dict:
+        pixels = process_tiled(pixels, mode, size, apply_roberts_operator, halo=1,
+                               tile_rows=int(args_dict['tile_rows']))
+    else:
+        pixels = apply_roberts_operator(pixels, size)
     save_image(pixels, mode, size, output_image_path)
     print(f"Edge-detected image saved as '{output_image_path}'")
\ No newline at end of file
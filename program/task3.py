@@ -3,7 +3,9 @@ import numpy as np
 from PIL import Image
 from utils.file_operations import load_image, save_image
 from utils.help import print_help
+from utils.log import get_logger
 from utils.parse_arguments import parse_arguments
+from utils.tiling import process_tiled
 from functions.morphological import dilation, erosion, closing, \
     opening, hitOrMiss, iterative_dilation
 from functions.segmentation import region_growing
@@ -11,6 +13,8 @@ from functions.segmentation import region_growing
 # TASK 3 SCRIPT
 # ==============================
 
+logger = get_logger('task3')
+
 
 # Main program logic
 if len(sys.argv) < 2 or '--help' in sys.argv:
@@ -20,25 +24,42 @@ if len(sys.argv) < 2 or '--help' in sys.argv:
 input_image_path = sys.argv[1]
 output_image_path = sys.argv[2]
 commands = sys.argv[3:]
+args_dict = parse_arguments(commands, globals())  # Parsed first so --profile covers loading
 
 original_pixels, mode, size, im = load_image(input_image_path)
 pixels = original_pixels.copy()
-args_dict = parse_arguments(commands)
+
+
+def apply_morphology(operator, image, *kernels, passes=1):
+    """
+    Apply a morphology operator to the whole binary image, or strip by strip
+    with --tile_rows. passes is how many erosions/dilations the operator
+    chains (2 for opening and closing), since each one widens the halo.
+    """
+    if 'tile_rows' not in args_dict:
+        return operator(image, *kernels)
+
+    halo = (passes * max(kernel.shape[0] for kernel in kernels) // 2,
+            passes * max(kernel.shape[1] for kernel in kernels) // 2)
+    return process_tiled(
+        image, '1', size,
+        lambda tile, tile_size: operator(np.asarray(tile), *kernels),
+        halo=halo, tile_rows=int(args_dict['tile_rows'])
+    ).array
+
 
 # ========== DILATION ========== #
 if 'dilation' in args_dict:
     print("Performing dilation on the binary image...")
 
     original_array = np.array(im)
-    print("Original image array:")
-    print(original_array)
+    logger.debug("Original image array:\n%s", original_array)
 
     # Ensure the image is binary (1-bit)
     if mode == '1':  # Check if the image is binary (1-bit)
         # Convert the binary image to a numpy array (True/False)
         binary_array = np.array(im)  # This already has values of True (white) and False (black)
-        print("Binary array:")
-        print(binary_array)
+        logger.debug("Binary array:\n%s", binary_array)
     else:
         print("The image is not binary (1-bit). Please provide a binary image.")
         sys.exit(1)
@@ -51,11 +72,10 @@ if 'dilation' in args_dict:
     ])
 
     # Apply dilation
-    dilated_image = dilation(original_array, structuring_element)
+    dilated_image = apply_morphology(dilation, original_array, structuring_element)
 
-    # Debugging: Print the dilated image array
-    print("Dilated binary array:")
-    print(dilated_image)
+    # Debugging: log the dilated image array (shown with --verbose)
+    logger.debug("Dilated binary array:\n%s", dilated_image)
 
     # Flatten the dilated image before saving
     flattened_pixels = dilated_image.flatten()  # Convert the 2D numpy array to a 1D array
@@ -69,14 +89,12 @@ elif 'erosion' in args_dict:
     print("Performing erosion on the binary image...")
 
     original_array = np.array(im)
-    print("Original image array:")
-    print(original_array)
+    logger.debug("Original image array:\n%s", original_array)
 
     # Ensure the image is binary (1-bit)
     if mode == '1':  # Check if the image is binary (1-bit)
         binary_array = np.array(im)  # This already has values of True (white) and False (black)
-        print("Binary array:")
-        print(binary_array)
+        logger.debug("Binary array:\n%s", binary_array)
     else:
         print("The image is not binary (1-bit). Please provide a binary image.")
         sys.exit(1)
@@ -89,11 +107,10 @@ elif 'erosion' in args_dict:
     ])
 
     # Apply erosion
-    eroded_image = erosion(original_array, structuring_element)
+    eroded_image = apply_morphology(erosion, original_array, structuring_element)
 
-    # Debugging: Print the eroded image array
-    print("Eroded binary array:")
-    print(eroded_image)
+    # Debugging: log the eroded image array (shown with --verbose)
+    logger.debug("Eroded binary array:\n%s", eroded_image)
 
     # Flatten the eroded image before saving
     flattened_pixels = eroded_image.flatten()  # Convert the 2D numpy array to a 1D array
@@ -106,14 +123,12 @@ elif 'opening' in args_dict:
     print("Performing opening on the binary image...")
 
     original_array = np.array(im)
-    print("Original image array:")
-    print(original_array)
+    logger.debug("Original image array:\n%s", original_array)
 
     # Ensure the image is binary (1-bit)
     if mode == '1':  # Check if the image is binary (1-bit)
         binary_array = np.array(im)  # This already has values of True (white) and False (black)
-        print("Binary array:")
-        print(binary_array)
+        logger.debug("Binary array:\n%s", binary_array)
     else:
         print("The image is not binary (1-bit). Please provide a binary image.")
         sys.exit(1)
@@ -126,11 +141,10 @@ elif 'opening' in args_dict:
     ])
 
     # Apply opening
-    opened_image = opening(original_array, structuring_element)
+    opened_image = apply_morphology(opening, original_array, structuring_element, passes=2)
 
-    # Debugging: Print the opened image array
-    print("Opened binary array:")
-    print(opened_image)
+    # Debugging: log the opened image array (shown with --verbose)
+    logger.debug("Opened binary array:\n%s", opened_image)
 
     # Flatten the opened image before saving
     flattened_pixels = opened_image.flatten()  # Convert the 2D numpy array to a 1D array
@@ -143,14 +157,12 @@ elif 'closing' in args_dict:
     print("Performing closing on the binary image...")
 
     original_array = np.array(im)
-    print("Original image array:")
-    print(original_array)
+    logger.debug("Original image array:\n%s", original_array)
 
     # Ensure the image is binary (1-bit)
     if mode == '1':  # Check if the image is binary (1-bit)
         binary_array = np.array(im)
-        print("Binary array:")
-        print(binary_array)
+        logger.debug("Binary array:\n%s", binary_array)
     else:
         print("The image is not binary (1-bit). Please provide a binary image.")
         sys.exit(1)
@@ -163,11 +175,10 @@ elif 'closing' in args_dict:
     ])
 
     # Apply closing
-    closed_image = closing(original_array, structuring_element)
+    closed_image = apply_morphology(closing, original_array, structuring_element, passes=2)
 
-    # Debugging: Print the closed image array
-    print("Closed binary array:")
-    print(closed_image)
+    # Debugging: log the closed image array (shown with --verbose)
+    logger.debug("Closed binary array:\n%s", closed_image)
 
     # Flatten the closed image before saving
     flattened_pixels = closed_image.flatten()  # Convert the 2D numpy array to a 1D array
@@ -209,8 +220,7 @@ elif 'hit-or-miss' in args_dict:
     print("Performing hit-or-miss transform on the binary image...")
 
     original_array = np.array(im)
-    print("Original image array:")
-    print(original_array)
+    logger.debug("Original image array:\n%s", original_array)
 
     # Ensure the image is binary (1-bit)
     if mode != '1':  # Check if the image is binary (1-bit)
@@ -294,10 +304,9 @@ elif 'hit-or-miss' in args_dict:
                     [1, 1, 0],
                     [1, 1, 0]])
     # Call the hitOrMiss function
-    final_hit_or_miss_result = hitOrMiss(original_array, kernel1, kernel2)
+    final_hit_or_miss_result = apply_morphology(hitOrMiss, original_array, kernel1, kernel2)
 
-    print("Final Hit-or-Miss Result:")
-    print(final_hit_or_miss_result)
+    logger.debug("Final Hit-or-Miss Result:\n%s", final_hit_or_miss_result)
 
     # Save the result
     save_image(
@@ -318,8 +327,7 @@ elif 'm3' in args_dict:
 
     # Convert the image to a numpy array
     original_array = np.array(im)
-    print("Original image array:")
-    print(original_array)
+    logger.debug("Original image array:\n%s", original_array)
 
     # Parse the starting point p from the arguments (e.g., 'p=x,y')
     p_str = args_dict.get('p', '2,2')  # Default to (0, 0) if not provided
@@ -338,8 +346,7 @@ elif 'm3' in args_dict:
     final_result = iterative_dilation(original_array, p, structuring_element)
 
     # Print the final result of iterative dilation
-    print("Final iterative dilation result:")
-    print(final_result)
+    logger.debug("Final iterative dilation result:\n%s", final_result)
 
     # Flatten the result before saving
     flattened_pixels = final_result.flatten()  # Convert the 2D numpy array to a 1D array
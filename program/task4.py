@@ -23,14 +23,14 @@ input_image_path = sys.argv[1]
 output_image_path = sys.argv[2]
 commands = sys.argv[3:]
 
+# Parse command-line arguments into a dictionary (first, so --profile covers loading)
+args_dict = parse_arguments(commands, globals())
+
 # Load image and extract metadata
 original_pixels, mode, size, im = load_image(input_image_path)
 pixels = original_pixels.copy()
 
 
-# Parse command-line arguments into a dictionary
-args_dict = parse_arguments(commands)
-
 # Precompute frequency data if needed
 use_fast = str(args_dict.get("fast", "True")).lower() == "true"
 
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+from batch import output_subdir
+
+PROGRAM = os.path.join(os.path.dirname(__file__), '..')
+
+
+def test_output_subdir_keeps_extension_and_directories():
+    root = 'in'
+
+    assert output_subdir(os.path.join('in', 'lena.bmp'), root) == 'lena_bmp'
+    assert output_subdir(os.path.join('in', 'lena.png'), root) == 'lena_png'
+    assert output_subdir(os.path.join('in', 'b', 'lena.bmp'), root) == os.path.join('b', 'lena_bmp')
+
+
+def test_task_error_fails_the_image(tmp_path):
+    image_dir = os.path.join(PROGRAM, 'images', 'grayscale')
+
+    run = subprocess.run(
+        [sys.executable, os.path.join(PROGRAM, 'batch.py'), 'task1', os.path.join(image_dir, 'lena.bmp'),
+         str(tmp_path), '--shrink=0', '--workers=1'],
+        capture_output=True, text=True, timeout=120,
+    )
+
+    assert '[Error: Shrink factor must be greater than 0.] lena.bmp' in run.stdout
+    assert 'Processed 0/1 images' in run.stdout
+    with open(tmp_path / 'lena_bmp' / 'log.txt') as f:
+        assert 'Error: Shrink factor' in f.read()
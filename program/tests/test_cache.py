@@ -0,0 +1,9 @@
+from functions.noise_removal import median_filter
+from utils.cache import code_digest
+from utils.profiling import Profiler
+
+
+def test_code_digest_sees_through_profiled_wrapper():
+    wrapped = Profiler().wrap(median_filter, 'median_filter')
+
+    assert code_digest(wrapped) == code_digest(median_filter)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from functions.noise_removal import geometric_mean_filter
+from utils.image_data import ImageData
+
+# Run from the program directory: python -m pytest tests
+
+
+def test_geometric_mean_single_zero_does_not_darken_window():
+    image = np.full((5, 5), 255, dtype=np.uint8)
+    image[2, 2] = 0  # One pepper pixel
+
+    result = np.asarray(geometric_mean_filter(ImageData(image, 'L'), 5, 5, 3).array)
+
+    assert result.min() == 255
+
+
+def test_geometric_mean_all_zero_window_stays_black():
+    image = np.zeros((4, 4), dtype=np.uint8)
+
+    result = np.asarray(geometric_mean_filter(ImageData(image, 'L'), 4, 4, 3).array)
+
+    assert result.max() == 0
+
+
+def test_geometric_mean_flat_area_is_unchanged():
+    image = np.full((6, 6, 3), 100, dtype=np.uint8)
+
+    result = np.asarray(geometric_mean_filter(ImageData(image, 'RGB'), 6, 6, 5).array)
+
+    assert (result == 100).all()
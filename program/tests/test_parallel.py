@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+from PIL import Image
+
+from functions.noise_removal import median_filter
+from utils.image_data import ImageData
+
+PROGRAM = os.path.join(os.path.dirname(__file__), '..')
+
+
+def test_processes_with_profile(tmp_path):
+    image_path = str(tmp_path / 'noisy.bmp')
+    Image.fromarray(np.random.default_rng(0).integers(0, 255, (64, 48), dtype=np.uint8, endpoint=True)).save(image_path)
+
+    # The task script instruments its own namespace, so run it as a script, not via import
+    run = subprocess.run(
+        [sys.executable, os.path.abspath(os.path.join(PROGRAM, 'task1.py')), image_path, image_path,
+         '--median=3', '--processes=2', '--profile'],
+        cwd=tmp_path, capture_output=True, text=True, timeout=120,
+    )
+
+    assert run.returncode == 0, run.stderr
+    assert 'process_parallel' in run.stdout
+    noisy = np.asarray(Image.open(image_path))
+    serial = np.asarray(median_filter(ImageData(noisy, 'L'), 48, 64, 3).array)
+    assert (np.asarray(Image.open(tmp_path / 'output_median.bmp')) == serial).all()
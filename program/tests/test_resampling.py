@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from functions.resampling import RESAMPLING_FILTERS, resample
+from utils.file_operations import load_image
+
+IMAGES = os.path.join(os.path.dirname(__file__), '..', 'images')
+PIL_FILTERS = {'box': Image.BOX, 'bilinear': Image.BILINEAR, 'bicubic': Image.BICUBIC, 'lanczos': Image.LANCZOS}
+# Upscales with output pixels centred exactly on source pixel boundaries (2 -> 3, 512 -> 768, ...)
+UPSCALES = [(768, 768), (700, 300), (333, 900), (512, 513), (1024, 1024)]
+
+
+def test_every_filter_is_compared():
+    assert set(PIL_FILTERS) == set(RESAMPLING_FILTERS)
+
+
+def test_box_upscale_on_pixel_boundary():
+    result = resample(np.array([[10, 200]], dtype=np.uint8), (2, 1), (3, 1), 'box', 'L')
+
+    assert result.array.tolist() == [[10, 200, 200]]
+
+
+@pytest.mark.parametrize('method', sorted(PIL_FILTERS))
+@pytest.mark.parametrize('new_size', UPSCALES)
+def test_upscale_matches_pil(method, new_size):
+    pixels, mode, size, im = load_image(os.path.join(IMAGES, 'grayscale', 'lena.bmp'))
+
+    ours = np.asarray(resample(pixels, size, new_size, method).array, dtype=int)
+    expected = np.asarray(im.resize(new_size, PIL_FILTERS[method]), dtype=int)
+
+    # PIL rounds to 8 bits between its two passes, which costs at most one grey level here
+    assert np.abs(ours - expected).max() <= 1
+
+
+@pytest.mark.parametrize('method', sorted(PIL_FILTERS))
+def test_colour_upscale_close_to_pil(method):
+    pixels, mode, size, im = load_image(os.path.join(IMAGES, 'lenac.bmp'))
+
+    ours = np.asarray(resample(pixels, size, (768, 768), method).array, dtype=int)
+    difference = np.abs(ours - np.asarray(im.resize((768, 768), PIL_FILTERS[method]), dtype=int))
+
+    # On sharp colour edges PIL clamps the overshoot of its first pass, so the
+    # negative-lobe filters drift a few levels there; we keep that pass in float.
+    assert difference.max() <= (1 if method in ('box', 'bilinear') else 8)
+    assert difference.mean() < 0.3
@@ -0,0 +1,156 @@
+import functools
+import hashlib
+import inspect
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.image_data import ImageData
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'image-processing')
+# Part of every key; bump it when cached results change for a reason code_digest cannot see
+# (e.g. a new numpy with different rounding), so old entries are not served any more
+CACHE_VERSION = 1
+
+
+def image_digest(pixels):
+    """Hash the pixel content (values, shape and dtype) of an image."""
+    array = np.ascontiguousarray(pixels.array if isinstance(pixels, ImageData) else np.asarray(pixels))
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f'{array.dtype.str}{array.shape}'.encode())
+    digest.update(memoryview(array).cast('B'))
+    return digest.hexdigest()
+
+
+def code_digest(func):
+    """
+    Hash the source file that defines func. It is part of the cache key, so a
+    change to the filter (or to a helper in the same module) never serves
+    results of the old code from the on-disk cache.
+    """
+    func = inspect.unwrap(func)  # The filter, not e.g. the profiler's wrapper around it
+    digest = hashlib.blake2b(digest_size=20)
+    try:
+        with open(inspect.getsourcefile(func), 'rb') as f:
+            digest.update(f.read())
+    except (TypeError, OSError):
+        digest.update(func.__qualname__.encode())  # Built-in or source not available
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed cache for image operation results.
+
+    Results are keyed by a hash of the input pixels, the operation name, its
+    parameters and its code (code_digest and CACHE_VERSION). They are kept in an in-memory LRU and, if cache_dir is
+    set, in .npy files on disk so repeated runs over the same images are
+    instant. Both levels evict least recently used entries once their size
+    cap (in bytes) is exceeded; on disk, recency is the file mtime.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_memory_bytes=256 * 2**20, max_disk_bytes=1024 * 2**20):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(name, pixels, params, version=''):
+        key = hashlib.blake2b(digest_size=20)
+        key.update(f'{CACHE_VERSION}:{version}:{name}'.encode())
+        key.update(image_digest(pixels).encode())
+        key.update(repr(params).encode())
+        return key.hexdigest()
+
+    def get(self, key):
+        """Return the cached array for key, or None."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        if self.cache_dir:
+            path = os.path.join(self.cache_dir, f'{key}.npy')
+            try:
+                array = np.load(path)
+            except (FileNotFoundError, ValueError, OSError):
+                return None
+            os.utime(path)  # Mark as recently used
+            self._remember(key, array)
+            return array
+        return None
+
+    def put(self, key, array):
+        """Store an array under key in memory and on disk."""
+        self._remember(key, array)
+        if self.cache_dir:
+            path = os.path.join(self.cache_dir, f'{key}.npy')
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            with open(temp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(temp_path, path)  # Atomic, so parallel batch workers never read partial files
+            self._evict_disk()
+
+    def wrap(self, func, name=None):
+        """
+        Wrap a filter with signature func(pixels, *params) so repeated calls
+        with the same pixels and parameters are computed only once.
+        The wrapped filter returns an ImageData with its own copy of the
+        pixels, so changing a result never alters the cached entry.
+        """
+        name = name or func.__name__
+        version = code_digest(func)
+
+        @functools.wraps(func)
+        def cached_func(pixels, *params):
+            mode = pixels.mode if isinstance(pixels, ImageData) else None
+            shape = np.shape(pixels)
+            key = self.make_key(name, pixels, params, version)
+            result = self.get(key)
+            if result is None:
+                result = np.asarray(func(pixels, *params))
+                if result.dtype.kind in 'iu' and result.size and 0 <= result.min() and result.max() <= 255:
+                    result = result.astype(np.uint8)  # Filters produce 8-bit values; store them compactly
+                self.put(key, result)
+            else:
+                logger.info(f"Using cached result of {name}")
+            return ImageData(result.reshape(shape).copy(), mode)
+
+        return cached_func
+
+    def _remember(self, key, array):
+        if key in self._memory:
+            return
+        self._memory[key] = array
+        self._memory_bytes += array.nbytes
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npy'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Removed by another process meanwhile
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -1,20 +1,195 @@
+import glob
+import os
+import struct
 import sys
+
+import numpy as np
 from PIL import Image
 
-def load_image(image_path):
-    """Loads an image and returns a pixel matrix."""
+from utils.image_data import ImageData, array_to_pil, as_array
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# BMP bit depths handled by the memory-mapped backend, per PIL mode
+BMP_BIT_DEPTHS = {'1': 1, 'L': 8, 'RGB': 24}
+
+IMAGE_EXTENSIONS = ('.bmp', '.png', '.jpg', '.jpeg', '.tif', '.tiff')
+
+
+def collect_images(source):
+    """Return the sorted image paths of a directory, or the matches of a glob pattern."""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+        paths = [path for path in paths if path.lower().endswith(IMAGE_EXTENSIONS)]
+    else:
+        paths = glob.glob(source)
+    return sorted(os.path.abspath(path) for path in paths if os.path.isfile(path))
+
+
+def load_image(image_path, use_memmap=False):
+    """
+    Loads an image and returns its pixels as an ImageData (NumPy-backed).
+
+    The ImageData still indexes and iterates like the old flat list of pixels,
+    so code written against `list(im.getdata())` keeps working.
+    With use_memmap=True, uncompressed BMPs are mapped from disk instead of
+    decoded (see read_bmp_memmap); other files fall back to PIL.
+    """
     try:
-        im = Image.open(image_path)
-        pixels = list(im.getdata())  # Get the pixels as a flat list
+        im = Image.open(image_path)  # Lazy: PIL only reads the header here
+        pixels = None
+        if use_memmap:
+            try:
+                pixels = read_bmp_memmap(image_path)
+            except ValueError:
+                pixels = None  # Not a BMP layout we can map, decode it normally
+        if pixels is None:
+            pixels = ImageData.from_pil(im)  # One array instead of a list of tuples
         width, height = im.size
-        return pixels, im.mode, (width, height), im  # Return the image object as well
+        return pixels, pixels.mode, (width, height), im  # Return the image object as well
     except FileNotFoundError:
-        print(f"Error: The file '{image_path}' does not exist.")
+        logger.error(f"Error: The file '{image_path}' does not exist.")
         sys.exit()
 
 def save_image(pixels, mode, size, output_path):
-    """Converts pixel data back to an image and saves it."""
-    new_image = Image.new(mode, size)
-    new_image.putdata(pixels)
-    new_image.save(output_path)
-    print(f"Image saved to {output_path}")
+    """Converts pixel data (ImageData, array or flat list) back to an image and saves it."""
+    if output_path.lower().endswith('.bmp') and mode in BMP_BIT_DEPTHS:
+        # Stream BMPs row by row instead of building a full PIL image
+        write_bmp(pixels, mode, size, output_path)
+    else:
+        new_image = array_to_pil(as_array(pixels, mode, size), mode)
+        new_image.save(output_path)
+    logger.info(f"Image saved to {output_path}")
+
+
+def read_bmp_header(image_path):
+    """
+    Parse the file and DIB headers of an uncompressed BMP.
+
+    Returns a dict with width, height, bit depth, pixel data offset,
+    row stride, palette (or None) and whether rows are stored bottom-up.
+    Raises ValueError for files this backend cannot map.
+    """
+    with open(image_path, 'rb') as f:
+        file_header = f.read(14)
+        if len(file_header) < 14 or file_header[:2] != b'BM':
+            raise ValueError(f"'{image_path}' is not a BMP file.")
+        pixel_offset, = struct.unpack('<I', file_header[10:14])
+
+        dib_size, = struct.unpack('<I', f.read(4))
+        if dib_size == 12:  # BITMAPCOREHEADER
+            width, height, _, bit_depth = struct.unpack('<HHHH', f.read(8))
+            compression, colors_used, palette_entry = 0, 0, 3
+        elif dib_size >= 40:  # BITMAPINFOHEADER and its V4/V5 extensions
+            width, height, _, bit_depth, compression = struct.unpack('<iiHHI', f.read(16))
+            _, _, _, colors_used, _ = struct.unpack('<IiiII', f.read(20))
+            palette_entry = 4
+        else:
+            raise ValueError(f"Unsupported BMP header size {dib_size}.")
+
+        if compression != 0:
+            raise ValueError("Compressed BMPs cannot be memory-mapped.")
+        if bit_depth not in (1, 8, 24):
+            raise ValueError(f"Unsupported BMP bit depth {bit_depth}.")
+
+        palette = None
+        if bit_depth <= 8:
+            colors = colors_used or 2 ** bit_depth
+            f.seek(14 + dib_size)
+            palette = np.frombuffer(f.read(colors * palette_entry), dtype=np.uint8)
+            palette = palette.reshape(colors, palette_entry)[:, 2::-1]  # BGR(A) -> RGB
+
+    return {
+        'width': width,
+        'height': abs(height),
+        'bottom_up': height > 0,  # Negative height means top-down rows
+        'bit_depth': bit_depth,
+        'offset': pixel_offset,
+        'stride': ((width * bit_depth + 31) // 32) * 4,  # Rows are padded to 4 bytes
+        'palette': palette,
+    }
+
+
+def read_bmp_memmap(image_path):
+    """
+    Map the pixel array of an uncompressed BMP with numpy.memmap.
+
+    The returned ImageData is a read-only view into the file: row padding,
+    bottom-up row order and BGR channel order are all handled with strides,
+    so nothing is read until pixels are touched. 8-bit files must use a
+    grayscale palette. 1-bit files are unpacked into a 0/255 array since
+    bits cannot be addressed through a view.
+    """
+    header = read_bmp_header(image_path)
+    width, height, bit_depth = header['width'], header['height'], header['bit_depth']
+
+    rows = np.memmap(image_path, dtype=np.uint8, mode='r',
+                     offset=header['offset'], shape=(height, header['stride']))
+    if header['bottom_up']:
+        rows = rows[::-1]
+
+    if bit_depth == 24:
+        pixels = rows[:, :width * 3].reshape(height, width, 3)[:, :, ::-1]
+        return ImageData(pixels, 'RGB')
+
+    palette = header['palette']
+    if bit_depth == 8:
+        if not np.array_equal(palette, np.repeat(np.arange(len(palette)), 3).reshape(-1, 3)):
+            raise ValueError("Only grayscale-palette 8-bit BMPs can be memory-mapped.")
+        return ImageData(rows[:, :width], 'L')
+
+    # 1-bit: unpack the bits, then map palette index to black/white
+    bits = np.unpackbits(rows, axis=1)[:, :width]
+    white = palette.sum(axis=1) > 255 * 3 // 2
+    return ImageData(np.where(white[bits], 255, 0).astype(np.uint8), '1')
+
+
+def write_bmp(pixels, mode, size, output_path, chunk_rows=256):
+    """
+    Write pixels as an uncompressed BMP, streaming chunk_rows rows at a time.
+
+    Supports modes '1', 'L' and 'RGB'. Only one padded chunk is held in memory
+    besides the source, which may itself be a memory-mapped image.
+    Values are clamped to 0..255 like Image.putdata does.
+    """
+    if mode not in BMP_BIT_DEPTHS:
+        raise ValueError(f"Cannot write mode '{mode}' as BMP.")
+    array = as_array(pixels, mode, size)
+    width, height = size
+    bit_depth = BMP_BIT_DEPTHS[mode]
+    stride = ((width * bit_depth + 31) // 32) * 4
+
+    if mode == '1':
+        palette = bytes([0, 0, 0, 0, 255, 255, 255, 0])
+    elif mode == 'L':
+        palette = np.repeat(np.arange(256, dtype=np.uint8), 4).reshape(256, 4)
+        palette[:, 3] = 0
+        palette = palette.tobytes()
+    else:
+        palette = b''
+
+    offset = 14 + 40 + len(palette)
+    file_size = offset + stride * height
+    with open(output_path, 'wb') as f:
+        f.write(struct.pack('<2sIHHI', b'BM', file_size, 0, 0, offset))
+        f.write(struct.pack('<IiiHHIIiiII', 40, width, height, 1, bit_depth, 0,
+                            stride * height, 3780, 3780, len(palette) // 4, 0))
+        f.write(palette)
+
+        buffer = np.zeros((chunk_rows, stride), dtype=np.uint8)  # Padding bytes stay zero
+        # BMP rows are stored bottom-up, so walk the image from the last row
+        for stop in range(height, 0, -chunk_rows):
+            start = max(stop - chunk_rows, 0)
+            block = np.asarray(array[start:stop])[::-1]
+            count = stop - start
+            if mode == '1':
+                packed = np.packbits(block != 0, axis=1)
+                buffer[:count, :packed.shape[1]] = packed
+            else:
+                if block.dtype != np.uint8:
+                    block = np.clip(block, 0, 255).astype(np.uint8)
+                if mode == 'RGB':
+                    block = block[:, :, ::-1].reshape(count, width * 3)  # RGB -> BGR
+                buffer[:count, :block.shape[1]] = block
+            f.write(buffer[:count].tobytes())
@@ -14,17 +14,84 @@ def print_help():
       --hflip                 Flip the image horizontally
       --vflip                 Flip the image vertically
       --dflip                 Flip the image along the diagonal (transpose)
+      --adflip                Flip the image along the anti-diagonal
+      --rotate=value          Rotate counter-clockwise by any angle in degrees (e.g. 90 or 2.5 to deskew)
+      --interpolation=method  Sampling for angles that are not a multiple of 90: nearest or bilinear
+      --expand                Grow the rotated image so no corner is cut off
       --shrink=value          Shrink the image by the given factor (e.g., 2 to halve the size)
       --enlarge=value         Enlarge the image by the given factor (e.g., 2 to double the size)
+      --resample=method       Filter used by shrink/enlarge/resize: box, bilinear, bicubic or lanczos
+                              (with it, shrink and enlarge also accept factors like 1.5)
+      --resize=WxH            Resample the image to W x H pixels (bilinear unless --resample is given)
+      --thumbnails=s1,s2,...  Save previews at the given scales (e.g. 0.5,0.25,0.1) from an image pyramid
+      --pyramid=method        How pyramid levels are reduced: box (2x2 average, default) or gaussian
     
     Noise removal methods:
      --alpha Alpha-trimmed mean filter
      --gmean geometric mean filter 
+     --median                Median filter (window size from --kernel_size, default 3)
+     --amedian[=value]       Adaptive median filter; the window grows up to the given odd size (default 7)
+     --vmedian               Vector median filter for colour noise: picks whole colours of the window
+                             (the other filters work on each RGB channel separately)
+
+    Similarity measures (original vs. alpha-trimmed mean filtered noisy image; add the
+    _gmean suffix, e.g. --psnr_gmean, to compare with the geometric mean filtered one):
+      --mse --pmse --snr --psnr --md
+                              All requested measures come from a single comparison
+      --per_channel           Also print every measure for each channel separately
+      --ssim --ms_ssim        Structural similarity and its multi-scale version (1.0 = identical)
+      --ssim_window=value     SSIM window: gaussian (11x11, sigma 1.5, default) or box (integral image)
+      --ssim_map              Also save the SSIM of every window as output_ssim_map.bmp
+
+    Denoiser tuning (finds the filter parameters that best restore the noisy image):
+      --tune[=alpha,median]   Search the given denoisers (default: alpha,gmean,median,amedian,vmedian)
+                              and save the best result as output_tuned.bmp
+      --tune_metric=value     Score to optimize: mse (default) or ssim
+      --proxy=value           Search on the images decimated by this factor first (default 2, 1 = off)
+      --confirm=value         How many of the best denoisers are checked at full resolution, with their
+                              3 best settings each (default 3)
+
+    Histogram and statistics (task2.py):
+      --roi=x0,y0,x1,y1       Only count the pixels of this rectangle (x1, y1 exclusive) for --histogram
+                              and the statistics (--cmean, --cvariance, ...)
+      --joint_histogram[=red,blue]
+                              Save the joint histogram of two colour channels (default red,green)
+                              as joint_histogram.png (or --joint_histogram_output=path)
+
+    Input options:
+      --mmap                  Memory-map uncompressed BMP inputs instead of decoding them
+      --tile_rows=value       Run neighbourhood filters in horizontal strips of this many rows
+                              (also the task3 morphology operators, except --m3 and region growing)
+      --processes=value       Run the noise removal filters in row bands on this many processes
+                              (needs the fork start method, e.g. Linux; otherwise runs serially)
+      --no_intermediate       Only save the result of the last elementary/geometric step
+      --cache_dir=path        Where filter results are cached (default: ~/.cache/image-processing)
+      --no_cache              Always recompute filter results
+      --profile[=trace.json]  Print time, CPU, peak memory and pixels per operation (optionally a Chrome trace)
+
+    Output verbosity:
+      --verbose               Also print diagnostic array dumps (debug level)
+      --quiet                 Only print warnings and errors from the operations
+      --log_level=value       One of debug, info, warning, error (default: info)
      
      
+    Batch mode (all images of a directory or glob, in parallel):
+      python3 batch.py <task> <input_dir_or_glob> <output_dir> [--command=value ...]
+      --workers=value         Number of worker processes (default: number of CPUs)
+      --pair_dir=path         Directory holding the second image (same file name) for each input
+
+    Compare mode (one reference against many candidates, e.g. a denoiser sweep):
+      python3 compare.py <reference> <candidate_file_dir_or_glob> ... [--command=value ...]
+      --metrics=list          Comma-separated columns (default: mse,pmse,snr,psnr,md)
+      --per_channel           Add a column per channel for every metric
+      --sort=metric           Order the candidates from best to worst by this metric
+      --output=path           Also save the table as CSV, or as JSON for a .json path
+
     Example Usage:
       python3 main.py input.bmp output.bmp --brightness=50 --contrast=1.5
       python3 main.py input.bmp output.bmp --hflip --shrink=2
       python3 main.py input.bmp output.bmp --brightness=50 --contrast=1.2 --negative --vflip
+      python3 batch.py task1 images/grayscale out --negative --workers=8
+      python3 compare.py images/lenac.bmp sweep/ --sort=psnr --output=sweep.csv
     """
     print(help_text)
@@ -0,0 +1,137 @@
+import numpy as np
+from PIL import Image
+
+
+class ImageData:
+    """
+    NumPy-backed image container.
+
+    Holds the pixels as a single uint8 array of shape (height, width) for
+    single-channel images or (height, width, channels) for colour images,
+    together with the PIL mode. It also behaves like the flat list of pixels
+    that `load_image` used to return (indexing, slicing, iteration, len and
+    copy), so the existing functions keep working unchanged.
+    """
+
+    def __init__(self, array, mode):
+        self.array = array
+        self.mode = mode
+        self._flat = None
+
+    @classmethod
+    def from_pil(cls, im):
+        """Wrap a PIL image without creating per-pixel Python objects."""
+        array = np.asarray(im)
+        if im.mode == '1':
+            # Match getdata(): binary pixels are reported as 0 / 255
+            array = array.astype(np.uint8) * 255
+        return cls(array, im.mode)
+
+    @classmethod
+    def from_pixels(cls, pixels, mode, size):
+        """Build an ImageData from a flat list of pixels (or any array-like)."""
+        return cls(as_array(pixels, mode, size), mode)
+
+    @property
+    def width(self):
+        return self.array.shape[1]
+
+    @property
+    def height(self):
+        return self.array.shape[0]
+
+    @property
+    def size(self):
+        """(width, height), the same order PIL uses."""
+        return self.width, self.height
+
+    @property
+    def channels(self):
+        return 1 if self.array.ndim == 2 else self.array.shape[2]
+
+    def to_pil(self):
+        """Convert back to a PIL image."""
+        return array_to_pil(self.array, self.mode)
+
+    def to_pixels(self):
+        """Return the old flat-list representation (ints or tuples)."""
+        return list(self)
+
+    # ---- list-compatibility adapters ---- #
+
+    def _flat_view(self):
+        # Flat (N,) or (N, C) view used for 1D indexing into the image
+        if self._flat is None:
+            if self.array.ndim == 2:
+                self._flat = self.array.reshape(-1)
+            else:
+                self._flat = self.array.reshape(-1, self.array.shape[2])
+        return self._flat
+
+    def __len__(self):
+        return self.array.shape[0] * self.array.shape[1]
+
+    def __getitem__(self, index):
+        value = self._flat_view()[index]
+        if isinstance(index, slice):
+            if value.ndim == 1:
+                return value.tolist()
+            return [tuple(pixel) for pixel in value.tolist()]
+        if self.array.ndim == 2:
+            return int(value)
+        return tuple(value.tolist())
+
+    def __setitem__(self, index, value):
+        if not self.array.flags.writeable or not self.array.flags.c_contiguous:
+            # Arrays wrapped from PIL are read-only and flipped/transposed views are
+            # strided (their flat view would be a copy); copy on first write
+            self.array = np.array(self.array, order='C')
+            self._flat = None
+        self._flat_view()[index] = value
+
+    def __iter__(self):
+        if self.array.ndim == 2:
+            return iter(self.array.reshape(-1).tolist())
+        return (tuple(pixel) for pixel in self._flat_view().tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is not None:
+            return self.array.astype(dtype)
+        return self.array.copy() if copy else self.array
+
+    def copy(self):
+        return ImageData(self.array.copy(), self.mode)
+
+
+def as_array(pixels, mode, size):
+    """
+    Return the pixels as an array of shape (height, width) or (height, width, channels).
+
+    Accepts an ImageData, a NumPy array (flat or already 2D/3D) or the flat
+    list of ints / tuples used throughout the functions package.
+    """
+    if isinstance(pixels, ImageData):
+        return pixels.array
+
+    width, height = size
+    array = np.asarray(pixels)
+    if array.ndim >= 2 and array.shape[:2] == (height, width):
+        return array
+    if array.size == width * height:
+        return array.reshape(height, width)
+    return array.reshape(height, width, -1)
+
+
+def array_to_pil(array, mode):
+    """Convert a pixel array to a PIL image, clamping like Image.putdata does."""
+    if mode == '1':
+        return Image.fromarray(np.asarray(array) != 0)
+
+    array = np.asarray(array)
+    if array.dtype != np.uint8:
+        array = np.clip(array, 0, 255).astype(np.uint8)
+    array = np.ascontiguousarray(array)
+    size = (array.shape[1], array.shape[0])
+    # Hand the buffer straight to PIL instead of going through putdata
+    return Image.frombuffer(mode, size, array, 'raw', mode, 0, 1)
+
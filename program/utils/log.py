@@ -0,0 +1,68 @@
+import logging
+import sys
+
+# All loggers of the project live under this name, so configuring it never touches PIL's or numpy's loggers
+ROOT_LOGGER_NAME = 'image_processing'
+
+LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+
+def get_logger(name):
+    """
+    Logger for a module of the project, e.g. get_logger(__name__).
+
+    Diagnostic dumps of whole arrays go to logger.debug with %-style arguments
+    (logger.debug("Result:\\n%s", array)), so the array is only converted to
+    text when debug output is actually enabled.
+    """
+    return logging.getLogger(f'{ROOT_LOGGER_NAME}.{name}')
+
+
+def configure_logging(args_dict):
+    """
+    Set the verbosity from the parsed command-line arguments.
+
+    --verbose shows debug output (array dumps), --quiet only warnings and errors,
+    --log_level=debug|info|warning|error sets the level explicitly.
+    The default is info, which prints the same progress messages as before.
+    """
+    level = logging.INFO
+    if 'verbose' in args_dict:
+        level = logging.DEBUG
+    if 'quiet' in args_dict:
+        level = logging.WARNING
+    if isinstance(args_dict.get('log_level'), str):
+        level = LOG_LEVELS.get(args_dict['log_level'].lower(), level)
+
+    logger = logging.getLogger(ROOT_LOGGER_NAME)
+    if not logger.handlers:
+        # Plain messages on stdout, so info output looks like the former print statements
+        handler = _StdoutHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """
+    Writes to whatever sys.stdout is at the time of the message, so
+    redirect_stdout (batch worker logs, benchmark) captures log output too.
+    """
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
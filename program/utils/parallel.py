@@ -0,0 +1,109 @@
+import inspect
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.image_data import ImageData, as_array
+from utils.log import get_logger
+from utils.tiling import iter_tiles
+
+logger = get_logger(__name__)
+
+# Bands per worker, so a worker that finishes early can pick up another band
+BANDS_PER_WORKER = 4
+
+# Shared arrays of the current worker process, attached once by _attach_shared
+_shared = {}
+
+
+def _attach_shared(source_spec, target_spec):
+    """Pool initializer: map the shared input and output arrays into this worker."""
+    for key, (name, shape, dtype) in (('source', source_spec), ('target', target_spec)):
+        block = shared_memory.SharedMemory(name=name)
+        _shared[key] = (block, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+
+def _run_band(operator, args, mode, source, target, crop):
+    """Filter one band (plus halo) of the shared input and write it into the shared output."""
+    src_y0, src_y1, src_x0, src_x1 = source
+    y0, y1, x0, x1 = target
+    cy0, cy1, cx0, cx1 = crop
+
+    image = _shared['source'][1]
+    tile = ImageData(image[src_y0:src_y1, src_x0:src_x1], mode)
+    tile_size = (src_x1 - src_x0, src_y1 - src_y0)
+    result = as_array(operator(tile, tile_size[0], tile_size[1], *args), mode, tile_size)
+    _shared['target'][1][y0:y1, x0:x1] = result[cy0:cy1, cx0:cx1]
+
+
+def process_parallel(pixels, mode, size, operator, args=(), halo=1, workers=None, band_rows=None):
+    """
+    Run a neighbourhood filter over row bands in a pool of worker processes.
+
+    The input and output images live in shared memory: workers read their band
+    (grown by the halo, like process_tiled) straight from the input and write
+    their rows into the output, so only band coordinates are pickled.
+    Every output row is computed exactly as in the serial filter, which makes
+    the result bit-identical to it.
+
+    Args:
+        pixels: ImageData, array or flat list of pixels.
+        mode: Image mode ('L', 'RGB', ...).
+        size: Tuple (width, height) of the image.
+        operator: Module-level filter with the signature
+            operator(pixels, width, height, *args), e.g. alpha_trimmed_mean_filter.
+            It is sent to the workers by name, so lambdas do not work here.
+            Wrappers (e.g. those of --profile) are unwrapped first; the
+            profiler times process_parallel itself instead of the bands.
+        args: Extra arguments of the filter (kernel size, alpha, ...).
+        halo: Kernel radius of the filter.
+        workers: Number of processes (default: number of CPUs).
+        band_rows: Rows per band (default: about BANDS_PER_WORKER bands per worker).
+
+    Returns:
+        ImageData with the filtered uint8 image.
+    """
+    width, height = size
+    workers = workers or os.cpu_count() or 1
+    band_rows = band_rows or max(math.ceil(height / (workers * BANDS_PER_WORKER)), 1)
+    image = as_array(pixels, mode, size)
+
+    if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+        # Spawned workers would import the task scripts (which are not import-guarded)
+        # as __main__ and re-run them, so without fork the filter runs in this process
+        logger.warning("Warning: Process pools need the fork start method here; running the filter serially.")
+        workers = 1
+
+    if workers == 1:
+        # Not worth starting a pool (and copying the image) for a single process
+        return ImageData(operator(ImageData(image, mode), width, height, *args), mode)
+
+    # Only the module-level function pickles by name, not a functools.wraps wrapper of it
+    band_operator = inspect.unwrap(operator)
+    source_block = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+    target_block = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+    try:
+        np.ndarray(image.shape, dtype=image.dtype, buffer=source_block.buf)[...] = image
+        source_spec = (source_block.name, image.shape, image.dtype.str)
+        target_spec = (target_block.name, image.shape, image.dtype.str)
+
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_attach_shared,
+                                 initargs=(source_spec, target_spec)) as executor:
+            futures = [executor.submit(_run_band, band_operator, args, mode, source, target, crop)
+                       for source, target, crop in iter_tiles(width, height, halo, band_rows)]
+            for future in futures:
+                future.result()  # Re-raise errors of the workers here
+
+        # Copy out before the shared block goes away
+        result = np.ndarray(image.shape, dtype=image.dtype, buffer=target_block.buf).copy()
+    finally:
+        for block in (source_block, target_block):
+            block.close()
+            block.unlink()
+
+    return ImageData(result, mode)
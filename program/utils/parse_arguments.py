@@ -1,5 +1,14 @@
-def parse_arguments(arguments):
-    """Parses the command-line arguments in the form of --argument=value or just --flag."""
+from utils.log import configure_logging
+from utils.profiling import enable_profiling
+
+def parse_arguments(arguments, namespace=None):
+    """
+    Parses the command-line arguments in the form of --argument=value or just --flag.
+
+    If --profile (or --profile=trace.json) is given and the calling script passes
+    its globals() as namespace, every operation it dispatches is profiled.
+    --verbose, --quiet and --log_level=level set how much the operations log.
+    """
     args_dict = {}
     i = 0
     while i < len(arguments):
@@ -19,4 +28,9 @@ def parse_arguments(arguments):
                 # Treat as a flag with no value
                 args_dict[key] = True
         i += 1
+
+    configure_logging(args_dict)
+    if 'profile' in args_dict and namespace is not None:
+        trace_path = args_dict['profile'] if isinstance(args_dict['profile'], str) else None
+        enable_profiling(namespace, trace_path)
     return args_dict
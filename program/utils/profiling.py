@@ -0,0 +1,161 @@
+import atexit
+import functools
+import inspect
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+from utils.image_data import ImageData
+
+# Modules whose functions count as dispatched operations when profiling a task script.
+# utils.parallel is timed here because the filters it runs in worker processes are not.
+PROFILED_MODULES = ('functions.', 'utils.file_operations', 'utils.parallel')
+
+# Profiler of the task script currently running in this process, until finish_profiling reports it
+_current = None
+
+
+def count_pixels(args):
+    """Number of pixels in the first image-like argument (0 if there is none)."""
+    for arg in args:
+        if isinstance(arg, ImageData):
+            return arg.width * arg.height
+        if isinstance(arg, np.ndarray) and arg.ndim >= 2:
+            return arg.shape[0] * arg.shape[1]
+        if isinstance(arg, np.ndarray) or (isinstance(arg, list) and len(arg) > 256):
+            return len(arg)
+    return 0
+
+
+class Profiler:
+    """
+    Records wall time, CPU time, peak traced memory and pixels processed
+    for every wrapped operation, then prints a summary table and optionally
+    writes a Chrome trace (chrome://tracing / Perfetto) JSON file.
+    """
+
+    def __init__(self, trace_path=None):
+        self.trace_path = trace_path
+        self.records = []
+        self._stack = []  # Open calls, so peak memory of nested calls is carried to the caller
+        self._patched = []  # (class, method name, original method), restored by finish()
+        self._origin = time.perf_counter()
+
+    def wrap(self, func, name):
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame = {'memory': current, 'peak': 0}
+            self._stack.append(frame)
+
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                wall = time.perf_counter() - start_wall
+                cpu = time.process_time() - start_cpu
+                self._stack.pop()
+                frame_peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], frame_peak)
+                self.records.append({
+                    'name': name,
+                    'start': start_wall - self._origin,
+                    'wall': wall,
+                    'cpu': cpu,
+                    'peak_bytes': max(frame_peak - frame['memory'], 0),
+                    # Fall back to the result for loaders and other ops that take no image
+                    'pixels': count_pixels(args) or count_pixels(result if isinstance(result, tuple) else (result,)),
+                    'depth': len(self._stack),
+                })
+        return profiled
+
+    def instrument(self, namespace):
+        """Replace the operations imported into a task script's namespace with profiled wrappers."""
+        for name, member in list(namespace.items()):
+            module = getattr(member, '__module__', None) or ''
+            if not module.startswith(PROFILED_MODULES):
+                continue
+            if inspect.isfunction(member):
+                namespace[name] = self.wrap(member, name)
+            elif inspect.isclass(member):
+                for method_name, method in list(vars(member).items()):
+                    if inspect.isfunction(method) and not method_name.startswith('_'):
+                        self._patched.append((member, method_name, method))
+                        setattr(member, method_name, self.wrap(method, f'{name}.{method_name}'))
+
+    def summary(self):
+        """Print totals per operation."""
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record['name'], {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_bytes': 0, 'pixels': 0})
+            total['calls'] += 1
+            total['wall'] += record['wall']
+            total['cpu'] += record['cpu']
+            total['peak_bytes'] = max(total['peak_bytes'], record['peak_bytes'])
+            total['pixels'] += record['pixels']
+
+        print("\nProfile summary:")
+        print(f"{'operation':<40} {'calls':>5} {'wall s':>9} {'cpu s':>9} {'peak MB':>9} {'pixels':>10} {'MP/s':>8}")
+        for name, total in sorted(totals.items(), key=lambda item: -item[1]['wall']):
+            throughput = total['pixels'] / total['wall'] / 1e6 if total['wall'] and total['pixels'] else 0.0
+            print(f"{name:<40} {total['calls']:>5} {total['wall']:>9.4f} {total['cpu']:>9.4f} "
+                  f"{total['peak_bytes'] / 2**20:>9.2f} {total['pixels']:>10} {throughput:>8.2f}")
+
+    def write_trace(self, path):
+        """Write the records as complete ('X') events of the Chrome trace format."""
+        events = [{
+            'name': record['name'],
+            'ph': 'X',
+            'ts': record['start'] * 1e6,  # Microseconds
+            'dur': record['wall'] * 1e6,
+            'pid': os.getpid(),
+            'tid': 0,
+            'args': {'cpu_s': record['cpu'], 'peak_bytes': record['peak_bytes'], 'pixels': record['pixels']},
+        } for record in self.records]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        print(f"Chrome trace saved to {path}")
+
+    def finish(self):
+        """Report, and put the original methods back on the classes instrument() patched."""
+        for cls, method_name, method in reversed(self._patched):
+            setattr(cls, method_name, method)
+        self._patched = []
+        self.summary()
+        if self.trace_path:
+            self.write_trace(self.trace_path)
+        tracemalloc.stop()
+
+
+def enable_profiling(namespace, trace_path=None):
+    """
+    Start profiling every operation in namespace. The report comes from
+    finish_profiling: called by whoever ran the script (batch workers, which
+    never reach atexit), or at interpreter exit for a plain script run.
+    """
+    global _current
+    finish_profiling()  # A previous script in this process that was not finished
+    _current = Profiler(trace_path)
+    tracemalloc.start()
+    _current.instrument(namespace)
+    return _current
+
+
+def finish_profiling():
+    """Report the profiler of the current script, if any, and undo its instrumentation."""
+    global _current
+    profiler, _current = _current, None
+    if profiler is not None:
+        profiler.finish()
+
+
+atexit.register(finish_profiling)
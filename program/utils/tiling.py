@@ -0,0 +1,70 @@
+import numpy as np
+
+from utils.image_data import ImageData, as_array
+
+
+def iter_tiles(width, height, halo, tile_rows=64, tile_cols=None):
+    """
+    Split a (width, height) image into tiles and yield their geometry.
+
+    halo is the kernel radius, either one int or a (halo_y, halo_x) pair.
+    With tile_cols=None the image is cut into full-width horizontal strips.
+
+    Yields (source, target, crop) tuples of (y0, y1, x0, x1):
+        source: region to read, i.e. the tile grown by the halo and clipped
+                to the image. At the image border no halo is added, so the
+                operator's own border handling (e.g. min(max(...)) clamping)
+                applies exactly as it does on the whole image.
+        target: region of the output the tile produces.
+        crop:   region of the operator's result that belongs to the target.
+    """
+    halo_y, halo_x = (halo, halo) if isinstance(halo, int) else halo
+    tile_cols = tile_cols or width
+
+    for y0 in range(0, height, tile_rows):
+        y1 = min(y0 + tile_rows, height)
+        src_y0, src_y1 = max(y0 - halo_y, 0), min(y1 + halo_y, height)
+        for x0 in range(0, width, tile_cols):
+            x1 = min(x0 + tile_cols, width)
+            src_x0, src_x1 = max(x0 - halo_x, 0), min(x1 + halo_x, width)
+            crop = (y0 - src_y0, y1 - src_y0, x0 - src_x0, x1 - src_x0)
+            yield (src_y0, src_y1, src_x0, src_x1), (y0, y1, x0, x1), crop
+
+
+def process_tiled(pixels, mode, size, operator, halo, tile_rows=64, tile_cols=None, out=None):
+    """
+    Run a neighbourhood operator tile by tile and stitch the results.
+
+    Args:
+        pixels: ImageData, array or flat list of pixels.
+        mode: Image mode ('L', 'RGB', '1', ...).
+        size: Tuple (width, height) of the image.
+        operator: Callable (tile_pixels, tile_size) -> pixels of the same size.
+            tile_pixels is an ImageData, so it can be handed to any of the
+            functions that expect the flat pixel list (or to np.asarray).
+        halo: Kernel radius, int or (halo_y, halo_x).
+        tile_rows, tile_cols: Tile size; tile_cols=None means full-width strips.
+        out: Optional preallocated output array (e.g. a numpy.memmap).
+
+    Returns:
+        ImageData with the stitched result. Peak memory is bounded by one tile
+        (plus halo) besides the source and output.
+    """
+    width, height = size
+    image = as_array(pixels, mode, size)
+
+    for source, target, crop in iter_tiles(width, height, halo, tile_rows, tile_cols):
+        src_y0, src_y1, src_x0, src_x1 = source
+        y0, y1, x0, x1 = target
+        cy0, cy1, cx0, cx1 = crop
+
+        tile = ImageData(image[src_y0:src_y1, src_x0:src_x1], mode)
+        tile_size = (src_x1 - src_x0, src_y1 - src_y0)
+        result = as_array(operator(tile, tile_size), mode, tile_size)
+
+        if out is None:
+            # Allocate once the operator's output dtype and channel count are known
+            out = np.empty((height, width) + result.shape[2:], dtype=result.dtype)
+        out[y0:y1, x0:x1] = result[cy0:cy1, cx0:cx1]
+
+    return ImageData(out, mode)